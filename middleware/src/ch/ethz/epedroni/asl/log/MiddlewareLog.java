@@ -38,7 +38,7 @@ public class MiddlewareLog {
 		logger.addHandler(handler);
 		// do not print to stderr or any other silliness 
 		logger.setUseParentHandlers(false);
-		logger.log(Level.INFO, "# type,Tmiddleware_in,Tmiddleware_out,Tqueue_in,Tqueue_out,Tserver_in,Tserver_out,Fsuccess");
+		logger.log(Level.INFO, "# type,Tmiddleware_in,Tmiddleware_out,Tqueue_in,Tqueue_out,Tserver_in,Tserver_out,Fsuccess,Nserver,Hkey");
 		return logger;
 	}
 }
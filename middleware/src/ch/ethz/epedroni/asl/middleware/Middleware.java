@@ -275,7 +275,8 @@ public class Middleware {
 	
 	/**
 	 * Given a request, this method returns the index of the server to
-	 * which it should be sent by hashing its key. 
+	 * which it should be sent by hashing its key. Both are recorded in
+	 * the request for the trace.
 	 * 
 	 * @param request the request to process
 	 * @return the destination server index
@@ -284,6 +285,7 @@ public class Middleware {
 		// TODO: investigate different hash functions - MD5?
 		int hash = Arrays.hashCode(request.getKey());
 		int server = Math.abs(hash % servers.length);
+		request.distributed(server, hash);
 		return server;
 	}
 }
\ No newline at end of file
@@ -42,6 +42,11 @@ public class Request {
 	private long timeMiddlewareIn = 0, timeQueueIn = 0, timeServerIn = 0;
 	private long timeMiddlewareOut = 0, timeQueueOut = 0, timeServerOut = 0;
 	private int successFlag = 0;
+	/**
+	 * Index of the memcached server the request was sent to and hash of its key,
+	 * logged to attribute latency to servers and keys.
+	 */
+	private int serverIndex = -1, keyHash = 0;
 	
 	/**
 	 * This constructor is visible only in the package as it may only be used
@@ -200,6 +205,17 @@ public class Request {
 		timeServerOut = time;
 	}
 	
+	/**
+	 * Sets the server the request is sent to and the hash of its key that chose it.
+	 * 
+	 * @param server the index of the destination server
+	 * @param hash the hash of the request's key
+	 */
+	public void distributed(int server, int hash) {
+		serverIndex = server;
+		keyHash = hash;
+	}
+	
 	/**
 	 * Marks this request as successful.
 	 */
@@ -212,7 +228,8 @@ public class Request {
 	 */
 	public void log() {
 		Middleware.TRACE_LOGGER.log(Level.INFO,
-				String.format("%s,%d,%d,%d,%d,%d,%d,%d",
-				type, timeMiddlewareIn, timeMiddlewareOut, timeQueueIn, timeQueueOut, timeServerIn, timeServerOut, successFlag));
+				String.format("%s,%d,%d,%d,%d,%d,%d,%d,%d,%d",
+				type, timeMiddlewareIn, timeMiddlewareOut, timeQueueIn, timeQueueOut, timeServerIn, timeServerOut, successFlag,
+				serverIndex, keyHash));
 	}
 }
@@ -0,0 +1,66 @@
+import numpy as np
+import mva
+
+# Capacity planning on the closed network model (see mva.py): for every combination of read threads per server
+# and memcached servers, find the largest client population whose response time percentile meets the SLO,
+# then rank the configurations by the throughput they reach. The response time percentile is approximated as
+# that of an exponential distribution with the modelled mean, mean * ln(100 / (100 - percentile)), i.e. about
+# 3 times the mean for p95, so configurations near the top should be validated with real runs.
+#
+# The SLO is on the response time clients see, as memaslap measures it: the time in the middleware plus the
+# client and network share that the model treats as think time (memaslap itself does not think).
+
+slo = 0.010 # percentile of the clients' response time to meet, in seconds
+sloPercentile = 95
+tolerance = 0.01 # configurations within this fraction of the best throughput come first, cheapest first
+
+# Response time percentile of an exponential distribution with the given mean
+def getPercentile(mean, percentile=sloPercentile):
+    return mean * np.log(100 / (100 - percentile))
+
+# Evaluate every configuration, demands as returned by mva.fitDemands. Returns a list of dictionaries, best
+# first, with the configuration, the best client count meeting the SLO and the modelled values at that count:
+# responseTime is as seen by the clients, middlewareTime the part spent in the middleware.
+# Configurations where not even the smallest client count meets the SLO are left out.
+def search(demands, readThreads, servers, clients, slo=slo, percentile=sloPercentile):
+    clients = np.sort(np.asarray(clients, dtype=int))
+    configurations = []
+
+    for s in servers:
+        for t in readThreads:
+            stations = mva.middlewareStations(s, t, demands["net"], demands["read"], demands["write"], demands["readFraction"])
+            results = mva.exact(stations, int(clients[-1]), demands["think"])
+
+            middlewareTime = results["responseTime"][clients - 1]
+            responseTime = middlewareTime + demands["think"]
+            meets = getPercentile(responseTime, percentile) <= slo
+            if not meets.any():
+                continue
+
+            best = np.flatnonzero(meets)[np.argmax(results["throughput"][clients - 1][meets])]
+            configurations.append({"servers": s, "readThreads": t, "clients": int(clients[best]),
+                                   "throughput": float(results["throughput"][clients[best] - 1]),
+                                   "responseTime": float(responseTime[best]),
+                                   "middlewareTime": float(middlewareTime[best]),
+                                   "percentile": float(getPercentile(responseTime[best], percentile)),
+                                   "bottleneck": results["bottleneck"]})
+
+    # the cheapest of the (nearly) best configurations first, then the rest by throughput
+    if len(configurations) > 0:
+        best = max([c["throughput"] for c in configurations])
+        configurations.sort(key=lambda c: (0, c["servers"], c["readThreads"], c["clients"]) if c["throughput"] >= (1 - tolerance) * best
+                            else (1, -c["throughput"]))
+    return configurations
+
+# Calibrate the model from an experiment's processed results and search the configuration space
+def optimise(memaslapResults, middlewareResults, readThreads=range(1, 65), servers=range(1, 8), clients=range(1, 641), slo=slo, percentile=sloPercentile):
+    return search(mva.fitDemands(memaslapResults, middlewareResults), readThreads, servers, clients, slo, percentile)
+
+# Prints the best count configurations to stdout
+def show(configurations, count=10, percentile=sloPercentile):
+    print(" Configurations meeting the SLO, best first")
+    print("    Servers  Threads  Clients  Throughput (jobs/s)  Mean Rt (s)  Mean Tmw (s)  P{:d} Rt (s)  Bottleneck".format(percentile))
+    for c in configurations[:count]:
+        print("    {:7d}  {:7d}  {:7d}  {:19,.2f}  {:11,.6f}  {:12,.6f}  {:10,.6f}  {:s}".format(c["servers"], c["readThreads"], c["clients"],
+              c["throughput"], c["responseTime"], c["middlewareTime"], c["percentile"], c["bottleneck"]))
+    print()
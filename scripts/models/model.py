@@ -1,28 +1,48 @@
-from math import factorial as fac
+import numpy as np
 
-# M/M/m model, returns a dictionary of results for the given parameters
+# M/M/m model, returns a dictionary of results for the given parameters, see modelGrid
 def model(lam, mu, m):
+    return dict([(k, v.item()) for (k, v) in modelGrid(lam, mu, m).items()])
+
+# M/M/m model over whole parameter grids: lam, mu and m are numbers or arrays (broadcast against each other)
+# and every result is an array of their broadcast shape. The Erlang-C terms are summed in log space so large
+# m and m * rho do not overflow. Configurations with rho >= 1 have no steady state: they are flagged False
+# in "stable", with p0 = 0, probabilityQueueing = 1 and infinite queue lengths and times.
+def modelGrid(lam, mu, m):
+    (lam, mu, m) = np.broadcast_arrays(np.asarray(lam, dtype=float), np.asarray(mu, dtype=float), np.asarray(m, dtype=np.int64))
     results = {}
     results["arrivalRate"] = lam
     results["serviceRate"] = mu
     results["servers"] = m
     
     rho = lam / (mu * m)
+    stable = rho < 1
     results["trafficIntensity"] = rho
+    results["stable"] = stable
     
-    p0 = 1 / (1 + (((m * rho) ** m) / (fac(m) * (1 - rho))) + sum([((m * rho) ** n) / fac(n) for n in range(1, m)]))
-    results["probabilityZeroSystem"] = p0
-    
-    pq = (((m * rho) ** m) / (fac(m) * (1 - rho))) * p0
-    results["probabilityQueueing"] = pq
-    
-    results["meanJobsSystem"] = (m * rho) + ((rho * pq) / (1 - rho))
-    
-    results["meanJobsQueue"] = rho * pq * (1 - rho)
-    
-    results["meanResponseTime"] = (1 / mu) * (1 + (pq / (m * (1 - rho))))
+    # log of the terms (m rho)^n / n! for n < m and (m rho)^m / (m! (1 - rho)), summed with log-sum-exp
+    n = np.arange(m.max() + 1)
+    logFactorial = np.concatenate(([0.0], np.cumsum(np.log(np.maximum(n[1:], 1)))))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        logLoad = np.log(m * rho)[..., None]
+        terms = np.where(n == 0, 0.0, n * logLoad) - logFactorial
+        logQueued = np.take_along_axis(terms, m[..., None], axis=-1)[..., 0] - np.log1p(-np.where(stable, rho, 0))
+        terms = np.where(n < m[..., None], terms, -np.inf)
+        logSum = np.logaddexp(np.logaddexp.reduce(terms, axis=-1), logQueued)
     
-    results["meanWaitingTime"] = pq / (m * mu * (1 - rho))
+        p0 = np.where(stable, np.exp(-logSum), 0.0)
+        results["probabilityZeroSystem"] = p0
+        
+        pq = np.where(stable, np.exp(logQueued - logSum), 1.0)
+        results["probabilityQueueing"] = pq
+        
+        results["meanJobsSystem"] = np.where(stable, (m * rho) + ((rho * pq) / (1 - rho)), np.inf)
+        
+        results["meanJobsQueue"] = np.where(stable, (rho * pq) / (1 - rho), np.inf)
+        
+        results["meanResponseTime"] = np.where(stable, (1 / mu) * (1 + (pq / (m * (1 - rho)))), np.inf)
+        
+        results["meanWaitingTime"] = np.where(stable, pq / (m * mu * (1 - rho)), np.inf)
     
     return results
 
@@ -34,6 +54,8 @@ def show(results):
     print()
     print(" Modelled values")
     print("    Traffic intensity (ρ): {:,.6f}".format(results["trafficIntensity"]))
+    if not results["stable"]:
+        print("    Unstable (ρ >= 1): the queue grows without bound")
     print("    Probability of 0 jobs in the system (p0): {:,.6f}".format(results["probabilityZeroSystem"]))
     print("    Probability of queueing (ϱ): {:,.6f}".format(results["probabilityQueueing"]))
     print("    Mean number of jobs in the system (E[n]): {:,.2f} jobs".format(results["meanJobsSystem"]))
@@ -0,0 +1,128 @@
+import numpy as np
+
+# Closed queueing network model of the whole system: memaslap clients -> middleware -> memcached and back.
+#
+# A network is a list of stations, dictionaries with a "name", a "demand" (total service time per request
+# in seconds, i.e. visit ratio times service time) and "servers": 1 for a single queue, m > 1 for m identical
+# threads serving one queue, 0 for a delay station (no queueing, e.g. the network round trip). Multi-server
+# stations are solved with Seidmann's approximation: a queue with demand D / m followed by a delay D (m - 1) / m.
+
+# Stations of the middleware: the network thread, then for each memcached server its pool of readThreads
+# read threads and its write thread (which replicates each write to replication servers before answering).
+# Requests are spread evenly over servers by key hash, so each server's stations get 1 / servers of the visits.
+# Memcached's own service is part of Tserver, during which the read or write thread waits for the answer,
+# so the memcached servers do not appear as separate stations.
+def middlewareStations(servers, readThreads, netDemand, readDemand, writeDemand, readFraction):
+    stations = [{"name": "net", "demand": netDemand, "servers": 1}]
+    for s in range(servers):
+        stations.append({"name": "read" + str(s), "demand": readFraction * readDemand / servers, "servers": readThreads})
+        stations.append({"name": "write" + str(s), "demand": (1 - readFraction) * writeDemand / servers, "servers": 1})
+    return stations
+
+# Fit the stations of an experiment from its processed results (memaslap.process() and middleware.process()),
+# returns (stations, think time), see fitDemands
+def fitStations(memaslapResults, middlewareResults, servers, readThreads):
+    demands = fitDemands(memaslapResults, middlewareResults)
+    return (middlewareStations(servers, readThreads, demands["net"], demands["read"], demands["write"], demands["readFraction"]), demands["think"])
+
+# Per-request demands of an experiment from its processed results: the network thread gets whatever part of Tmw
+# is neither queueing nor server time, read and write threads get the mean Tserver of gets and sets, and the
+# clients' think time is the part of memaslap's response time spent outside the middleware (network and client)
+def fitDemands(memaslapResults, middlewareResults):
+    gets = middlewareResults["getTmwSketch"].count
+    sets = middlewareResults["setTmwSketch"].count
+
+    demands = {}
+    demands["readFraction"] = gets / (gets + sets) if gets + sets > 0 else 1.0
+    demands["net"] = max(0.0, middlewareResults["combinedTmwMean"][0] - middlewareResults["combinedTqueueMean"][0] - middlewareResults["combinedTserverMean"][0])
+    demands["read"] = np.nan_to_num(middlewareResults["getTserverMean"][0])
+    demands["write"] = np.nan_to_num(middlewareResults["setTserverMean"][0])
+    demands["think"] = max(0.0, memaslapResults["combinedRtFinal"][0] - middlewareResults["combinedTmwMean"][0])
+    return demands
+
+# Split the stations into per-station queueing and delay demands, applying Seidmann's approximation
+def getDemands(stations):
+    demand = np.array([s["demand"] for s in stations], dtype=float)
+    servers = np.array([s["servers"] for s in stations], dtype=float)
+    queueing = np.where(servers > 0, demand / np.maximum(servers, 1), 0.0)
+    delay = np.where(servers > 0, demand * (servers - 1) / np.maximum(servers, 1), demand)
+    return (queueing, delay)
+
+# Exact Mean Value Analysis for 1 to clients clients with the given think time, returns a dictionary of arrays
+# indexed by client count - 1 (per-station arrays have one column per station)
+def exact(stations, clients, think=0.0):
+    (queueing, delay) = getDemands(stations)
+
+    throughput = np.zeros(clients)
+    residence = np.zeros((clients, len(stations)))
+    queue = np.zeros(len(stations))
+    for n in range(1, clients + 1):
+        r = queueing * (1 + queue) + delay
+        x = n / (think + r.sum())
+        queue = x * queueing * (1 + queue)
+        throughput[n - 1] = x
+        residence[n - 1] = r
+
+    return getResults(stations, throughput, residence)
+
+# Approximate MVA (Schweitzer-Bard) for a single population, iterating until the queue lengths change by less
+# than tolerance, returns a dictionary like exact() with a single row. Cost does not depend on the client count.
+def schweitzer(stations, clients, think=0.0, tolerance=1e-9, iterations=100000):
+    (queueing, delay) = getDemands(stations)
+
+    queue = np.full(len(stations), clients / len(stations))
+    for i in range(iterations):
+        r = queueing * (1 + queue * (clients - 1) / clients) + delay
+        x = clients / (think + r.sum())
+        updated = x * queueing * (1 + queue * (clients - 1) / clients)
+        if np.abs(updated - queue).max() < tolerance:
+            queue = updated
+            break
+        queue = updated
+
+    return getResults(stations, np.array([x]), r[None, :])
+
+# Model results from throughput and per-station residence times, see exact()
+def getResults(stations, throughput, residence):
+    demand = np.array([s["demand"] for s in stations], dtype=float)
+    servers = np.array([max(1, s["servers"]) for s in stations], dtype=float)
+
+    results = {}
+    results["stations"] = [s["name"] for s in stations]
+    results["throughput"] = throughput
+    results["responseTime"] = residence.sum(axis=1)
+    results["residenceTime"] = residence
+    results["queueLength"] = throughput[:, None] * residence
+    results["utilisation"] = throughput[:, None] * demand / servers
+    results["bottleneck"] = stations[int(np.argmax(demand / servers))]["name"]
+    results["maxThroughput"] = 1 / (demand / servers).max()
+    return results
+
+# Solve the network for one client count, with exact MVA for small populations and Schweitzer's approximation
+# for large ones. Returns a dictionary of scalars (and per-station arrays)
+def solve(stations, clients, think=0.0, exactLimit=1000):
+    if clients <= exactLimit:
+        results = exact(stations, clients, think)
+    else:
+        results = schweitzer(stations, clients, think)
+
+    for k in ["throughput", "responseTime", "residenceTime", "queueLength", "utilisation"]:
+        results[k] = results[k][-1]
+    results["clients"] = clients
+    results["thinkTime"] = think
+    return results
+
+# Prints a dictionary of results from solve() to stdout
+def show(results):
+    print(" Model parameters")
+    print("    Clients (N): {:d}".format(results["clients"]))
+    print("    Think time (Z): {:,.6f} s".format(results["thinkTime"]))
+    print()
+    print(" Modelled values")
+    print("    Throughput (X): {:,.2f} jobs/s".format(results["throughput"]))
+    print("    Response time (R): {:,.6f} s".format(results["responseTime"]))
+    print("    Bottleneck: {:s} (at most {:,.2f} jobs/s)".format(results["bottleneck"], results["maxThroughput"]))
+    for (i, name) in enumerate(results["stations"]):
+        print("    {:<8s} U {:6.2f}%  Q {:8.2f} jobs  R {:,.6f} s".format(name, results["utilisation"][i] * 100,
+              results["queueLength"][i], results["residenceTime"][i]))
+    print()
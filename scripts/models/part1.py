@@ -2,13 +2,11 @@
 
 import sys
 import os
-import yaml
 from pathlib import Path
 
 # custom imports from "upstairs"
 sys.path.append("/home/eddy/uni/eth/asl/dev")
-import memaslap
-import middleware
+import cache
 
 base = Path("/home/eddy/uni/eth/asl/dev/m3/part1")
 
@@ -26,30 +24,11 @@ requestType = "combined"
 measurement = "Tserver"
 suffix="MeanExp"
 
-# Caching
-# Cut here:------------------------------------------------------------------------------------
-memaResults = None
-middResults = None
-
-with open("cache.yml", "r") as f: data = yaml.load(f)
-if data is None: data = {}
+# Caching, shared with any other analysis using the same cache file
+dataCache = cache.Cache(base, base / "cache.db", runs=None)
 
 def getData(source, field):
-    global memaResults, middResults, data
-    
-    if source not in data:
-        data[source] = {}
-    
-    if field not in data[source]:
-        if source == "memaslap":
-            if memaResults is None: memaResults = memaslap.process([[str(l) for l in (base / "trace").glob("mema*.log")]])
-            data[source][field] = memaResults[field]
-        elif source == "middleware":
-            if middResults is None: middResults = middleware.process([str(base / "trace" / "middleware.log")])
-            data[source][field] = middResults[field]
-    
-    return data[source][field]      
-# Cut here:------------------------------------------------------------------------------------  
+    return dataCache.getData("trace", source, field)
 
 # Average time window
 runtime = getData("memaslap", "totalRuntime")
@@ -99,6 +78,3 @@ print("    Memaslap submission rate: {:,.6f} jobs/s".format(192 / getData("memas
 print("    Memaslap throughput: {:,.2f} jobs/s".format(getData("memaslap", "combinedTpsFinal")))
 print("    Real waiting time: {:,.6f} s".format(getData("memaslap", "combinedRtFinal")[0] - getData("middleware", "combinedTserverMeanExp")[0]))
 
-# Update cache in case we loaded something new
-with open("cache.yml", "w") as f: yaml.dump(data, stream=f)
-
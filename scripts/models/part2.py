@@ -18,16 +18,23 @@ Configurations in m2p2:
 import sys
 import os
 from pathlib import Path
+from functools import lru_cache
 sys.path.append("/home/eddy/uni/eth/asl/dev")
 import cache
-from model import model, show
+from sweep import Sweep
+from model import model, modelGrid, show
+import validate
+import numpy as np
 from numpy import mean
-import Gnuplot, Gnuplot.funcutils
+import render
 
 base = Path("/home/eddy/uni/eth/asl/dev/m3/part2/")
-dirTemplate = "sec3-rep{repl}-s{serv}-v{work}"
+dirTemplate = "sec3-rep{repl}-s{serv}-v{work}-r{run}"
 
-dataCache = cache.Cache(base / "data", base / "cache.yml")
+# directory names abbreviate some parameter values
+sweep = Sweep(base / "data", dirTemplate, values={"repl": {"1": "Single", "A": "Full"}, "work": {"2": "2.5", "7": "7.5"}})
+
+dataCache = cache.Cache(base / "data", base / "cache.db")
 
 # Constants
 readThreads = 20
@@ -46,99 +53,103 @@ replications = ["Single", "Full"]
 workloads = ["1", "2.5", "5", "7.5", "10"]
 runs = 5
 
-littleslaw = []
-
 # response time plot - triple plot, one for each server configuration
 # lines for: measured rt, modelled rt, tserver. x axis is workload, y axis is rt (s)
 
+# shared axis setup: workload on the x axis
+def workloadCommands():
+    return ["set grid", "set xtics (" + ", ".join(["'" + w + "' " + str(i) for (i, w) in enumerate(workloads)]) + ")"]
+
+# one figure per server count
 def main():
     global requestType
     repIndex = 0
-    #print("Servers\tWkload\tTPS\tReal Rt\tTqueue\tRho\tMod Rt\t\tMod Wt\t\tMod P0\tMod Pq\tMod JSystem\tMod JQueue\tLittle\t")
     requestType = "combined"
     
+    figures = []
+    data = computeGrid(replications[repIndex], requestType)
     for s in servers:
-        g = Gnuplot.Gnuplot()
-        g.title(str(s) + " Servers")
-        g("set grid")
-        g("set yrange [0:0.035]")
-        #g("set xrange [0:4]")
-        g("set xtics ('1' 0, '2.5' 1, '5' 2, '7.5' 3, '10' 4)")
-        g("set terminal png size 480,400")
-
-        g.xlabel("Workload Write Percentage")
-        g.ylabel("Response Time (s)")
-        g("set key off")
-        
         mert = []
         mort = []
         for (i, w) in enumerate(workloads):
-            exp = dirTemplate.format(repl=reps("Single"), serv=s, work=wl(w))
-            data = compute(replications[repIndex], s, w)
+            exp = sweep.experiment(repl="Single", serv=s, work=w)["name"]
             mert.append((i, dataCache.getData(exp, "memaslap", requestType + "RtFinal")[0]))
-            mort.append((i, data["meanResponseTime"]))
-        g._add_to_queue([Gnuplot.Data(mert, title="Measured Response Time", with_="lp")])
-        g._add_to_queue([Gnuplot.Data(mort, title="Modelled Response Time", with_="lp")])
-        g.hardcopy(filename="part2-rt-" + str(s) + ".png", terminal="png")
-    
+            mort.append((i, data["meanResponseTime"][servers.index(s), i]))
+        figures.append(render.figure("part2-rt-" + str(s) + ".png", str(s) + " Servers", "Workload Write Percentage", "Response Time (s)",
+                                     workloadCommands() + ["set yrange [0:0.035]", "set key off"],
+                                     [render.series(mert, title="Measured Response Time", with_="lp"),
+                                      render.series(mort, title="Modelled Response Time", with_="lp")], terminal="png size 480,400"))
+    return figures
 
 def jobs():
     global requestType
     repIndex = 0
-    #print("Servers\tWkload\tTPS\tReal Rt\tTqueue\tRho\tMod Rt\t\tMod Wt\t\tMod P0\tMod Pq\tMod JSystem\tMod JQueue\tLittle\t")
     requestType = "combined"
     
-    g = Gnuplot.Gnuplot()
-    g.title("Average Number of Jobs in Queue")
-    g("set grid")
-    g("set yrange [0:]")
-    #g("set xrange [0:4]")
-    g("set xtics ('1' 0, '2.5' 1, '5' 2, '7.5' 3, '10' 4)")
-    #g("set terminal png size 480,400")
-
-    g.xlabel("Workload Write Percentage")
-    g.ylabel("Jobs")
-    g("set key top right")
-    
-    for s in servers:
+    series = []
+    data = computeGrid(replications[repIndex], requestType)
+    for (j, s) in enumerate(servers):
         tmp = []
         for (i, w) in enumerate(workloads):
-            data = compute(replications[repIndex], s, w)
-            tmp.append((i, data["meanJobsQueue"]))
-        g._add_to_queue([Gnuplot.Data(tmp, title=str(s) +  " Servers", with_="lp")])
+            tmp.append((i, data["meanJobsQueue"][j, i]))
+        series.append(render.series(tmp, title=str(s) +  " Servers", with_="lp"))
     
-    g.hardcopy(filename="part2-jq.png", terminal="png")
+    return render.figure("part2-jq.png", "Average Number of Jobs in Queue", "Workload Write Percentage", "Jobs",
+                         workloadCommands() + ["set yrange [0:]", "set key top right"], series)
 
 def traffint():
     global requestType
     repIndex = 0
-    #print("Servers\tWkload\tTPS\tReal Rt\tTqueue\tRho\tMod Rt\t\tMod Wt\t\tMod P0\tMod Pq\tMod JSystem\tMod JQueue\tLittle\t")
     requestType = "combined"
     
-    g = Gnuplot.Gnuplot()
-    g.title("Traffic Intensity")
-    g("set grid")
-    g("set yrange [0:]")
-    #g("set xrange [0:4]")
-    g("set xtics ('1' 0, '2.5' 1, '5' 2, '7.5' 3, '10' 4)")
-    #g("set terminal png size 480,400")
-
-    g.xlabel("Workload Write Percentage")
-    g.ylabel("Traffic Intensity")
-    g("set key top right")
-    
-    for s in servers:
+    series = []
+    data = computeGrid(replications[repIndex], requestType)
+    for (j, s) in enumerate(servers):
         tmp = []
         for (i, w) in enumerate(workloads):
-            data = compute(replications[repIndex], s, w)
-            tmp.append((i, data["trafficIntensity"]))
-        g._add_to_queue([Gnuplot.Data(tmp, title=str(s) +  " Servers", with_="lp")])
+            tmp.append((i, data["trafficIntensity"][j, i]))
+        series.append(render.series(tmp, title=str(s) +  " Servers", with_="lp"))
     
-    g.hardcopy(filename="part2-traffint.png", terminal="png")
+    return render.figure("part2-traffint.png", "Traffic Intensity", "Workload Write Percentage", "Traffic Intensity",
+                         workloadCommands() + ["set yrange [0:]", "set key top right"], series)
     
+# Compare the models with the measurements of every experiment, writing the table to part2-validation.csv
+def validation():
+    configuration = lambda e: {"clients": clients, "servers": e["serv"], "readThreads": readThreads}
+    rows = validate.validate(sweep, dataCache, configuration)
+    validate.write(rows, "part2-validation.csv")
+    validate.show(rows)
+
+# Run the model for every server count and workload at once, results are arrays indexed [server, workload]
+@lru_cache(maxsize=None)
+def computeGrid(replication, requestType):
+    inputs = np.array([[getInputs(replication, s, w, requestType) for w in workloads] for s in servers])
+    return modelGrid(inputs[..., 0], inputs[..., 1], inputs[..., 2])
+
 # Run the model with numbers from the specified directory
 def compute(replication, server, workload, showResults=False):
-    exp = dirTemplate.format(repl=reps(replication), serv=server, work=wl(workload))
+    exp = sweep.experiment(repl=replication, serv=server, work=workload)["name"]
+    (arrivalRate, meanServiceRate, server) = getInputs(replication, server, workload, requestType)
+    results = model(arrivalRate, meanServiceRate, server)
+    
+    if showResults:
+        runtime = dataCache.getData(exp, "memaslap", "totalRuntime")
+        throughput = dataCache.getData(exp, "memaslap", requestType + "TotalOps") / runtime
+        meanServiceTime = dataCache.getData(exp, "middleware", requestType + "TserverMeanExp")[0]
+        show(results)
+        # Print sanity checks
+        print(" Checks")
+        print("    Utilization: {:,.2f}%".format((throughput / (threadsPerServer)) * (meanServiceTime / server) * 100))
+        print("    Memaslap response time: {:,.6f} s".format(dataCache.getData(exp, "memaslap", "combinedRtFinal")[0]))
+        print("    Memaslap submission rate: {:,.2f} jobs/s".format(clients / dataCache.getData(exp, "memaslap", "combinedRtFinal")[0]))
+        print("    Memaslap throughput: {:,.2f} jobs/s".format(dataCache.getData(exp, "memaslap", "combinedTpsFinal")))
+    
+    return results
+
+# Returns the model parameters (arrival rate, service rate, servers) of a configuration, each read from the cache once
+@lru_cache(maxsize=None)
+def getInputs(replication, server, workload, requestType):
+    exp = sweep.experiment(repl=replication, serv=server, work=workload)["name"]
 
     # Average time window
     runtime = dataCache.getData(exp, "memaslap", "totalRuntime")
@@ -156,47 +167,7 @@ def compute(replication, server, workload, showResults=False):
     meanServiceTime = dataCache.getData(exp, "middleware", requestType + "TserverMeanExp")[0]
     meanServiceRate = (1 / meanServiceTime) * threadsPerServer
 
-    results = model(arrivalRate, meanServiceRate, server)
+    return (arrivalRate, meanServiceRate, server)
     
-    if showResults:
-        show(results)
-        # Print sanity checks
-        print(" Checks")
-        print("    Utilization: {:,.2f}%".format((throughput / (threadsPerServer)) * (meanServiceTime / server) * 100))
-        print("    Memaslap response time: {:,.6f} s".format(dataCache.getData(exp, "memaslap", "combinedRtFinal")[0]))
-        print("    Memaslap submission rate: {:,.2f} jobs/s".format(clients / dataCache.getData(exp, "memaslap", "combinedRtFinal")[0]))
-        print("    Memaslap throughput: {:,.2f} jobs/s".format(dataCache.getData(exp, "memaslap", "combinedTpsFinal")))
-    
-    #                                                       Mod Wt-   Mod P0-  Mod Pq-  Mod MSystem-Mod MQueue
-    '''print("{:d}\t{:s}\t{:,.0f}\t{:,.4f}\t{:,.4f}\t{:,.4f}\t{:,.6f}\t{:,.6f}\t{:,.2f}\t{:,.2f}\t{:,.2f}\t\t{:,.2f}\t\t{:,.2f}".format(
-                                                                server, 
-                                                                workload, 
-                                                                dataCache.getData(exp, "memaslap", requestType + "TpsFinal"), 
-                                                                dataCache.getData(exp, "memaslap", requestType + "RtFinal")[0],
-                                                                dataCache.getData(exp, "middleware", requestType + "TqueueMeanExp")[0],
-                                                                results["trafficIntensity"], 
-                                                                results["meanResponseTime"],
-                                                                results["meanWaitingTime"],
-                                                                results["probabilityZeroSystem"],
-                                                                results["probabilityQueueing"],
-                                                                results["meanJobsSystem"],
-                                                                results["meanJobsQueue"],
-                                                                arrivalRate * dataCache.getData(exp, "memaslap", requestType + "RtFinal")[0]))'''
-    return results
-    
-def wl(w):
-    if w == "2.5":
-        return "2"
-    elif w == "7.5":
-        return "7"
-    else:
-        return w
-
-def reps(r):
-    if r == "Single":
-        return "1"
-    elif r == "Full":
-        return "A"
-
 if __name__ == "__main__":
-    main()
+    render.renderAll(main())
@@ -0,0 +1,141 @@
+import heapq
+import numpy as np
+import mva
+
+# Discrete-event simulation of the middleware with a closed population of clients, for what-if analysis of
+# thread counts and replication with the measured (not exponential) service time distributions.
+#
+# Each client sends a request, waits for the answer and sends the next one after a think time (the network
+# and client share of memaslap's response time). A request goes through the network thread (one FIFO server),
+# is assigned a memcached server uniformly at random (keys are hashed evenly) and joins that server's read
+# queue, served by readThreads threads, or its write queue, served by one thread which sends the write to
+# replication servers and answers once all of them have: its service time is the largest of replication draws
+# from the write distribution, which should be measured without replication.
+#
+# Every station is FIFO, so a request's start of service can be decided as soon as it joins a queue (events are
+# handled in time order) and only two events per request go through the heap. All random numbers are drawn up
+# front, in one vectorized call per distribution. Samplers are functions (rng, n) -> array of n samples in seconds.
+
+warmup = 0.1 # fraction of the requests discarded before measuring
+percentiles = [50, 90, 95, 99]
+
+# events, ordered by time first, then by kind
+arrive = 0 # request reaches the network thread
+dispatch = 1 # request leaves the network thread for a memcached server's queue
+
+# Sampler drawing from the empirical distribution in a sketch (see sketch.Sketch), e.g. getTserverSketch
+def fromSketch(sketch):
+    used = sketch.counts > 0
+    values = sketch.values()[used]
+    probabilities = sketch.counts[used] / sketch.counts[used].sum()
+    return lambda rng, n: rng.choice(values, size=n, p=probabilities)
+
+# Sampler drawing from a set of measured samples
+def fromSamples(samples):
+    samples = np.asarray(samples, dtype=float)
+    return lambda rng, n: samples[rng.integers(0, len(samples), size=n)]
+
+# Sampler drawing from an exponential distribution with the given mean
+def exponential(mean):
+    return lambda rng, n: rng.exponential(mean, size=n) if mean > 0 else np.zeros(n)
+
+# Samplers and read fraction of an experiment from its processed results (memaslap.process() and
+# middleware.process()), as keyword arguments for run(): Tserver distributions from the middleware sketches,
+# exponential network thread service and think times with the means fitted by mva.fitDemands
+def fit(memaslapResults, middlewareResults):
+    demands = mva.fitDemands(memaslapResults, middlewareResults)
+    return {"netService": exponential(demands["net"]), "think": exponential(demands["think"]),
+            "readService": fromSketch(middlewareResults["getTserverSketch"]),
+            "writeService": fromSketch(middlewareResults["setTserverSketch"]) if middlewareResults["setTserverSketch"].count > 0 else exponential(0),
+            "readFraction": demands["readFraction"]}
+
+# Simulate requests requests, returns a dictionary with the throughput, the per-request arrays "type" (0 for
+# reads, 1 for writes), "server", "Tmw", "Tqueue", "Tserver" and "Tclient" (Tmw plus think time, as memaslap
+# sees it) after warm-up, and summary statistics of each
+def run(clients, servers, readThreads, netService, readService, writeService, think, readFraction, replication=1,
+        requests=1000000, warmup=warmup, seed=None):
+    rng = np.random.default_rng(seed)
+
+    # everything random, drawn up front: request i is the ith to leave the network thread
+    netTime = netService(rng, requests + clients)
+    thinkTime = think(rng, requests + clients)
+    isWrite = rng.random(requests + clients) >= readFraction
+    server = rng.integers(0, servers, size=requests + clients)
+    serviceTime = np.where(isWrite, 0.0, readService(rng, requests + clients))
+    writes = np.flatnonzero(isWrite)
+    serviceTime[writes] = writeService(rng, len(writes) * replication).reshape(len(writes), replication).max(axis=1)
+
+    # per-request measurements, in lists while simulating since indexing them one at a time is faster
+    arrival = [0.0] * requests
+    dispatched = [0.0] * requests
+    start = [0.0] * requests
+    end = [0.0] * requests
+    (netList, thinkList, writeList, serverList, serviceList) = (netTime.tolist(), thinkTime.tolist(), isWrite.tolist(), server.tolist(), serviceTime.tolist())
+
+    # when each client's current request arrived, and when each thread is next free
+    sent = [0.0] * clients
+    netFree = 0.0
+    readFree = [[0.0] * readThreads for s in range(servers)]
+    writeFree = [0.0] * servers
+
+    events = [(thinkList[c], arrive, c) for c in range(clients)]
+    heapq.heapify(events)
+    (pop, push) = (heapq.heappop, heapq.heappush)
+    nets = 0
+    completed = 0
+
+    while completed < requests:
+        (t, kind, c) = pop(events)
+        if kind == arrive:
+            # the network thread reads requests one at a time
+            sent[c] = t
+            netFree = max(t, netFree) + netList[nets]
+            nets = nets + 1
+            push(events, (netFree, dispatch, c))
+        else:
+            i = completed
+            s = serverList[i]
+            if writeList[i]:
+                begin = max(t, writeFree[s])
+                finish = begin + serviceList[i]
+                writeFree[s] = finish
+            else:
+                pool = readFree[s]
+                begin = max(t, pop(pool))
+                finish = begin + serviceList[i]
+                push(pool, finish)
+            arrival[i] = sent[c]
+            dispatched[i] = t
+            start[i] = begin
+            end[i] = finish
+            completed = i + 1
+
+            # the answer goes back to the client, which sends its next request after thinking
+            push(events, (finish + thinkList[clients + i], arrive, c))
+
+    # requests are numbered by dispatch, so the measurements are in order of dispatch
+    (arrival, dispatched, start, end) = (np.array(arrival), np.array(dispatched), np.array(start), np.array(end))
+    keep = slice(int(requests * warmup), requests)
+    results = {}
+    results["type"] = isWrite[:requests][keep].astype(np.uint8)
+    results["server"] = server[:requests][keep]
+    results["Tqueue"] = (start - dispatched)[keep]
+    results["Tserver"] = (end - start)[keep]
+    results["Tmw"] = (end - arrival)[keep]
+    results["Tclient"] = results["Tmw"] + thinkTime[clients:clients + requests][keep]
+    results["throughput"] = (requests - keep.start) / (end[keep].max() - dispatched[keep].min())
+
+    for k in ["Tmw", "Tqueue", "Tserver", "Tclient"]:
+        results[k + "Mean"] = results[k].mean()
+        results[k + "Percentiles"] = list(zip(percentiles, np.percentile(results[k], percentiles)))
+    results["queueJobs"] = results["throughput"] * results["TqueueMean"]
+    return results
+
+# Prints a dictionary of results from run() to stdout
+def show(results):
+    print(" Simulated values")
+    print("    Throughput (X): {:,.2f} jobs/s".format(results["throughput"]))
+    print("    Jobs waiting in queues: {:,.2f} jobs".format(results["queueJobs"]))
+    for k in ["Tclient", "Tmw", "Tqueue", "Tserver"]:
+        print("    {:<8s} mean {:,.6f} s  ".format(k, results[k + "Mean"]) + "  ".join(["p{:d} {:,.6f} s".format(p, v) for (p, v) in results[k + "Percentiles"]]))
+    print()
@@ -0,0 +1,100 @@
+import csv
+import json
+import numpy as np
+import mva
+from model import modelGrid
+
+# Validation of the models against measured data: every experiment in a sweep (see sweep.Sweep) is run through
+# the M/M/m model (as in part2.compute) and the closed network model (mva.py), and their predictions are
+# compared with what was measured. Little's law is checked on the measurements themselves: with no think time
+# in memaslap, throughput times response time should equal the number of clients.
+#
+# Each experiment gives one row of measured and predicted values and the relative errors of each comparison,
+# rows with an error above threshold list the failing comparisons in "flagged".
+
+threshold = 0.2 # relative error above which a comparison is flagged
+writeThreads = 1 # write threads per memcached server
+
+# (name of the relative error, measured column, predicted column) of every comparison made
+comparisons = [("littleError", "clients", "littleJobs"),
+               ("mmmResponseTimeError", "responseTime", "mmmResponseTime"),
+               ("mmmQueueError", "queueJobs", "mmmQueueJobs"),
+               ("mvaThroughputError", "throughput", "mvaThroughput"),
+               ("mvaResponseTimeError", "middlewareTime", "mvaResponseTime")]
+
+# Validate every experiment in the sweep matching params. configuration returns the clients, servers and
+# readThreads of an experiment (as given by sweep.experiments) as a dictionary, dataCache is a cache.Cache
+def validate(sweep, dataCache, configuration, threshold=threshold, **params):
+    rows = []
+    for e in sweep.experiments(**params):
+        row = dict([(p, v) for (p, v) in e.items() if p != "runs"])
+        row.update(configuration(e))
+        row.update(measure(dataCache.getResults(e["name"], "memaslap"), dataCache.getResults(e["name"], "middleware")))
+        row.update(predict(row, dataCache.getResults(e["name"], "memaslap"), dataCache.getResults(e["name"], "middleware")))
+        compare(row, threshold)
+        rows.append(row)
+    return rows
+
+# Measured values of an experiment from its processed results
+def measure(memaslapResults, middlewareResults):
+    row = {}
+    row["throughput"] = memaslapResults["combinedTotalOps"] / memaslapResults["totalRuntime"]
+    row["responseTime"] = memaslapResults["combinedRtFinal"][0]
+    row["middlewareTime"] = middlewareResults["combinedTmwMean"][0]
+    row["serviceTime"] = middlewareResults["combinedTserverMean"][0]
+
+    # Little's law on the whole loop and on the middleware queues
+    row["littleJobs"] = row["throughput"] * row["responseTime"]
+    row["queueJobs"] = row["throughput"] * middlewareResults["combinedTqueueMean"][0]
+    return row
+
+# Predicted values of an experiment, from its configuration and measurements in row
+def predict(row, memaslapResults, middlewareResults):
+    threads = row["readThreads"] + writeThreads
+    results = modelGrid(row["throughput"], threads / row["serviceTime"], row["servers"])
+
+    prediction = {}
+    prediction["mmmStable"] = bool(results["stable"])
+    prediction["mmmResponseTime"] = float(results["meanResponseTime"])
+    prediction["mmmQueueJobs"] = float(results["meanJobsQueue"])
+
+    (stations, think) = mva.fitStations(memaslapResults, middlewareResults, row["servers"], row["readThreads"])
+    results = mva.solve(stations, row["clients"], think)
+    prediction["mvaThroughput"] = float(results["throughput"])
+    prediction["mvaResponseTime"] = float(results["responseTime"])
+    prediction["mvaBottleneck"] = results["bottleneck"]
+    return prediction
+
+# Add the relative error of every comparison to row and flag those above threshold
+def compare(row, threshold=threshold):
+    flagged = []
+    for (error, measured, predicted) in comparisons:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            row[error] = float(np.abs(np.float64(row[predicted]) - row[measured]) / abs(row[measured]))
+        if not row[error] <= threshold:
+            flagged.append(error)
+    row["flagged"] = " ".join(flagged)
+
+# Write rows to a CSV or JSON file, depending on its extension
+def write(rows, path):
+    path = str(path)
+    if path.endswith(".json"):
+        with open(path, "w") as f:
+            json.dump(rows, f, indent=4)
+        return
+
+    columns = []
+    for r in rows:
+        columns.extend([c for c in r if c not in columns])
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(rows)
+
+# Prints a summary of the flagged experiments to stdout
+def show(rows):
+    flagged = [r for r in rows if r["flagged"]]
+    print(" Validation: {:d} experiments, {:d} flagged".format(len(rows), len(flagged)))
+    for r in flagged:
+        print("    {:s}: {:s}".format(r["name"], ", ".join(["{:s} {:.1%}".format(e, r[e]) for e in r["flagged"].split()])))
+    print()
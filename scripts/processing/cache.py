@@ -1,37 +1,214 @@
 import memaslap, middleware
-import yaml
+import sqlite3
+import pickle
+import hashlib
+import os
 import sys
-import atexit
+import fcntl
+from pathlib import Path
+from collections import OrderedDict
+from parallel import parallelMap
 
+memoryEntries = 32 # processed experiments kept in memory, least recently used are dropped first
+timeout = 60 # seconds to wait for another process holding the database
+
+# settings of each source's module that change what it computes from the logs, part of every fingerprint
+settings = {"memaslap": (memaslap, ["steadyState", "steadyBatch", "stragglerLevel"]),
+            "middleware": (middleware, ["steadyState", "steadyResolution", "steadyBatch", "trimEdges", "keepSamples",
+                                        "sampleInterval", "slowLevel", "hotKeys"])}
+
+# Results cache backed by an sqlite database. The whole output of memaslap.process() or middleware.process()
+# is stored per experiment directory and source, read when it is asked for and written as soon as it is
+# computed. The most recently used results are also kept in memory, so within a session each experiment is
+# processed at most once and read from the database at most once while it stays in memory.
+# Entries remember a fingerprint (path, size, mtime) of the logs they came from and the processing settings
+# they were computed with, so they are recomputed automatically when any of those logs changes, appears or
+# disappears, or when a setting such as steady state detection is changed.
+#
+# Ingestion is incremental: the per-run aggregates (memaslap.combineMachines() and middleware.read()
+# results) are stored as well, so when runs are added to an experiment only the new runs are read and
+# the experiment's results are merged from the stored aggregates. Only run directories that exist are
+# used, up to runs of them, so an experiment can be refreshed while its batch is still running.
+#
+# Several processes can share the same cache file: the database is in WAL mode, entries are upserted one
+# at a time, and an experiment is processed under an exclusive lock (a file in cacheFile + ".locks") so a
+# process waiting for another to finish it picks up the stored results instead of processing it again.
+#
+# If runs is None, dirName is a single run directory rather than the prefix of dirName-r0, dirName-r1...
 class Cache(object):
-    def __init__(self, base, cacheFile, runs=5):
+    def __init__(self, base, cacheFile, runs=5, memoryEntries=memoryEntries):
         self.base = base
         self.memaResults = None
         self.middResults = None
         self.runs = runs
+        self.memory = OrderedDict()
+        self.memoryEntries = memoryEntries
         self.file = str(cacheFile)
-        with open(self.file, "r") as f: self.data = yaml.load(f)
-        if self.data is None: self.data = {}
-        atexit.register(self.flush)
+        self.locks = self.file + ".locks"
+        os.makedirs(self.locks, exist_ok=True)
+        self.db = sqlite3.connect(self.file, timeout=timeout)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS experiments (source TEXT, experiment TEXT, fingerprint TEXT, results BLOB, "
+                        "PRIMARY KEY (source, experiment))")
+        self.db.execute("CREATE TABLE IF NOT EXISTS runs (source TEXT, run TEXT, fingerprint TEXT, results BLOB, "
+                        "PRIMARY KEY (source, run))")
+        self.db.commit()
 
-    # Get one data field, only reading it from the file if it is not already cached
+    # Get one data field of an experiment, see getResults
     def getData(self, dirName, source, field):
-        key = dirName + field
-        
-        if source not in self.data:
-            self.data[source] = {}
-        
-        if key not in self.data[source]:
+        return self.getResults(dirName, source)[field]
+
+    # Get all processed results of an experiment, only reading the logs that are not cached or have changed
+    def getResults(self, dirName, source):
+        runs = self.getRuns(dirName, source)
+        fingerprint = getFingerprint([logs for (run, logs) in runs], source)
+        key = (source, dirName)
+
+        if key in self.memory and self.memory[key][0] == fingerprint:
+            self.memory.move_to_end(key)
+            return self.memory[key][1]
+
+        results = self.load("experiments", key, fingerprint)
+        if results is None:
+            with self.lock(key):
+                # another process may have stored it while we were waiting for the lock
+                results = self.load("experiments", key, fingerprint)
+                if results is None:
+                    intermediate = self.getRunResults(source, runs)
+                    if source == "memaslap":
+                        results = memaslap.summarise(memaslap.mergeRuns(intermediate))
+                    elif source == "middleware":
+                        results = middleware.mergeRuns(intermediate)
+                    self.store("experiments", key, fingerprint, results)
+
+        if source == "memaslap":
+            self.memaResults = results
+        elif source == "middleware":
+            self.middResults = results
+
+        self.remember(key, fingerprint, results)
+        return results
+
+    # Returns the per-run aggregates of the given (run, logs), reading only the runs that are not stored
+    def getRunResults(self, source, runs):
+        fingerprints = [getFingerprint(logs, source) for (run, logs) in runs]
+        intermediate = [self.load("runs", (source, run), f) for ((run, logs), f) in zip(runs, fingerprints)]
+        missing = [i for (i, x) in enumerate(intermediate) if x is None]
+
+        if source == "memaslap":
+            read = memaslap.readRuns([runs[i][1] for i in missing])
+        elif source == "middleware":
+            read = parallelMap(middleware.read, [runs[i][1] for i in missing])
+
+        for (i, results) in zip(missing, read):
+            intermediate[i] = results
+            self.store("runs", (source, runs[i][0]), fingerprints[i], results)
+
+        return intermediate
+
+    # Returns the results stored in table for key if they match the fingerprint, otherwise None
+    def load(self, table, key, fingerprint):
+        row = self.db.execute("SELECT fingerprint, results FROM " + table + " WHERE source = ? AND " + tables[table] + " = ?",
+                              key).fetchone()
+        if row is not None and row[0] == fingerprint:
+            return pickle.loads(row[1])
+        return None
+
+    # Atomically inserts or replaces the results stored in table for key
+    def store(self, table, key, fingerprint, results):
+        with self.db:
+            self.db.execute("INSERT INTO " + table + " VALUES (?, ?, ?, ?) ON CONFLICT (source, " + tables[table] + ") "
+                            "DO UPDATE SET fingerprint = excluded.fingerprint, results = excluded.results",
+                            (key[0], key[1], fingerprint, pickle.dumps(results)))
+
+    # Returns an exclusive lock on key shared by all processes using this cache file, to use in a with statement
+    def lock(self, key):
+        name = hashlib.sha1(repr(key).encode()).hexdigest()
+        return EntryLock(os.path.join(self.locks, name))
+
+    # Keep results in memory, dropping the least recently used ones beyond memoryEntries
+    def remember(self, key, fingerprint, results):
+        self.memory[key] = (fingerprint, results)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memoryEntries:
+            self.memory.popitem(last=False)
+
+    # Returns the logs of every run of an experiment in the format expected by the source's process()
+    def getLogs(self, dirName, source):
+        return [logs for (run, logs) in self.getRuns(dirName, source)]
+
+    # Returns (run directory, logs) for every run of an experiment that has logs for the source
+    def getRuns(self, dirName, source):
+        if self.runs is None:
+            runDirs = [self.base / dirName]
+        else:
+            runDirs = [self.base / (dirName + "-r" + str(r)) for r in range(0, self.runs)]
+
+        runs = []
+        for d in runDirs:
             if source == "memaslap":
-                self.memaResults = memaslap.process([[str(l) for l in (self.base / (dirName + "-r" + str(r))).glob("mema*.log")] for r in range(0, self.runs)])
-                self.data[source][key] = self.memaResults[field]
+                logs = memaslap.findLogs(d)
+                if len(logs) > 0: runs.append((str(d), logs))
             elif source == "middleware":
-                self.middResults = middleware.process([str(self.base / (dirName + "-r" + str(r)) / "middleware.log") for r in range(0, self.runs)])
-                self.data[source][key] = self.middResults[field]
-        
-        
-        return self.data[source][key]      
+                if (d / "middleware.log").exists(): runs.append((str(d), str(d / "middleware.log")))
+            else:
+                raise ValueError("Unknown source " + source)
+        return runs
 
-    # Update cache file
+    # Entries are written as they are computed, nothing is left to do
     def flush(self):
-        with open(self.file, "w") as f: yaml.dump(self.data, stream=f)
+        self.db.commit()
+
+# key column of each table
+tables = {"experiments": "experiment", "runs": "run"}
+
+# Exclusive advisory lock on a file, held for the duration of a with statement
+class EntryLock(object):
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+
+    def __enter__(self):
+        self.file = open(self.path, "a")
+        fcntl.flock(self.file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *args):
+        fcntl.flock(self.file, fcntl.LOCK_UN)
+        self.file.close()
+
+# Hash of the path, size and modification time of every log in a (nested) list of logs, and of the settings
+# of the source they are read with
+def getFingerprint(logs, source):
+    (module, names) = settings[source]
+    stats = [(n, getattr(module, n)) for n in names]
+    for l in flatten(logs):
+        if os.path.exists(l):
+            s = os.stat(l)
+            stats.append((l, s.st_size, s.st_mtime_ns))
+        else:
+            stats.append((l, None, None))
+    return hashlib.sha1(repr(stats).encode()).hexdigest()
+
+# Flatten a single log, a list of logs or a list of lists of logs
+def flatten(logs):
+    if isinstance(logs, str):
+        return [logs]
+    flat = []
+    for l in logs:
+        if isinstance(l, list):
+            flat.extend(flatten(l))
+        else:
+            flat.append(l)
+    return flat
+
+# Refresh the cached results of the given experiments, e.g. after each run of a batch finishes:
+# cache.py <results directory> <cache file> <experiment>...
+if __name__ == "__main__":
+    refreshCache = Cache(Path(sys.argv[1]), sys.argv[2])
+    for dirName in sys.argv[3:]:
+        for source in ["memaslap", "middleware"]:
+            runs = len(refreshCache.getRuns(dirName, source))
+            if runs > 0:
+                refreshCache.getResults(dirName, source)
+            print("{:s} {:s}: {:d} runs".format(dirName, source, runs))
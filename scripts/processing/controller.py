@@ -0,0 +1,75 @@
+#!/usr/bin/python3
+
+# Decides whether an experiment needs more runs, from the runs whose logs are already in. Each run is read
+# once (through the cache, so earlier runs are not read again) and the relative width of the confidence
+# interval of every metric across runs is compared with the target. The decision is written to a state file
+# and returned as the exit code, so the batch driver can stop stable configurations early:
+#
+# controller.py <results directory> <experiment> [--min-runs 3] [--max-runs 5] [--width 0.05]
+#
+# exit code stop (0) when the target is met or no more runs are allowed, more (3) when another run is needed
+import sys
+import json
+import argparse
+from pathlib import Path
+import numpy as np
+import cache
+import stats
+
+stop = 0
+more = 3
+
+# per-run value of each metric, from the per-run aggregates of each source
+metrics = {"memaslap": {"throughput": lambda x: x["combinedTpsFinal"],
+                        "responseTime": lambda x: x["combinedRtFinal"][0]},
+           "middleware": {"middlewareTime": lambda x: x["combinedTmwMean"][0]}}
+
+# Returns the state of an experiment: the runs so far and, for each metric, its mean, relative CI width and
+# the runs estimated to reach the target width, plus the decision
+def getState(dataCache, dirName, minRuns, maxRuns, width, level=None):
+    state = {"experiment": dirName, "runs": 0, "target": width, "metrics": {}}
+
+    for (source, extract) in metrics.items():
+        runs = dataCache.getRuns(dirName, source)
+        if len(runs) == 0:
+            continue
+        intermediate = dataCache.getRunResults(source, runs)
+        state["runs"] = max(state["runs"], len(intermediate))
+
+        for (name, value) in extract.items():
+            samples = np.array([value(x) for x in intermediate], dtype=float)
+            (m, ci) = stats.meanCI(samples, level)
+            state["metrics"][name] = {"mean": float(m),
+                                      "width": float(ci / abs(m)) if len(samples) > 1 and m != 0 else None,
+                                      "runsNeeded": stats.runsForWidth(samples, width, level, relative=True)}
+
+    met = len(state["metrics"]) > 0 and all([v["width"] is not None and v["width"] <= width for v in state["metrics"].values()])
+    state["precise"] = met
+    state["more"] = state["runs"] < minRuns or (not met and state["runs"] < maxRuns)
+    return state
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Decide whether an experiment needs more runs for the target precision")
+    parser.add_argument("base", help="results directory holding the run directories")
+    parser.add_argument("experiment", help="experiment name, run directories are <experiment>-r<run>")
+    parser.add_argument("--min-runs", type=int, default=3, help="always do at least this many runs")
+    parser.add_argument("--max-runs", type=int, default=5, help="never do more than this many runs")
+    parser.add_argument("--width", type=float, default=0.05, help="target CI half width, relative to the mean")
+    parser.add_argument("--level", type=float, default=stats.confidence, help="confidence level")
+    parser.add_argument("--cache", default=None, help="cache file, cache.db in the results directory by default")
+    parser.add_argument("--state", default=None, help="state file, <experiment>.state.json in the results directory by default")
+    args = parser.parse_args()
+
+    base = Path(args.base)
+    dataCache = cache.Cache(base, args.cache or base / "cache.db", runs=args.max_runs)
+    state = getState(dataCache, args.experiment, args.min_runs, args.max_runs, args.width, args.level)
+
+    with open(args.state or base / (args.experiment + ".state.json"), "w") as f:
+        json.dump(state, f, indent=4)
+
+    for (name, m) in state["metrics"].items():
+        print("{:s} {:s}: {:.4g} +/- {:s}, {:d} runs needed".format(args.experiment, name, m["mean"],
+              "?" if m["width"] is None else "{:.2%}".format(m["width"]), m["runsNeeded"]))
+    print("{:s}: {:d} runs, {:s}".format(args.experiment, state["runs"], "more runs needed" if state["more"] else "done"))
+
+    sys.exit(more if state["more"] else stop)
@@ -0,0 +1,175 @@
+#!/usr/bin/python3
+
+# Follows a middleware log while the middleware is still writing it, printing rolling-window metrics
+# every few seconds so saturated configurations can be spotted (and killed) before the run ends.
+#
+# follow.py <middleware.log> [--window 30] [--interval 5] [--csv metrics.csv] [--from-end]
+import os
+import sys
+import time
+import argparse
+from collections import OrderedDict
+import numpy as np
+import middleware
+from sketch import Sketch, mergeAll
+
+percentiles = [50, 95, 99]
+types = ["get", "set", "combined"]
+fields = ["Tqueue", "Tserver", "Tmw"]
+poll = 0.5 # seconds to wait before checking the log for new lines again
+
+# Rolling window over the last few seconds of a trace, by the time requests left the middleware.
+# Requests are summarised per second (counts and one sketch per key in middleware.lists), and seconds
+# that fall out of the window are dropped, so memory is bounded by the window length.
+class Window(object):
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.buckets = OrderedDict()
+        self.latest = None
+
+    # Add the requests in trace columns (see middleware.loadTrace) to the window
+    def add(self, trace):
+        if len(trace["type"]) == 0:
+            return
+
+        second = trace["timestamps"][1] // middleware.scale
+        for s in np.unique(second):
+            inSecond = second == s
+            chunk = dict([(k, v[..., inSecond]) for (k, v) in trace.items()])
+            bucket = self.getBucket(int(s))
+            for (t, inType) in getTypes(chunk).items():
+                bucket[t + "Requests"] = bucket[t + "Requests"] + int(np.count_nonzero(inType))
+                bucket[t + "Failed"] = bucket[t + "Failed"] + int(np.count_nonzero(inType & (chunk["success"] != 1)))
+            for (k, values) in middleware.getDurations(chunk).items():
+                bucket[k].add(values)
+
+        self.latest = max(self.latest if self.latest is not None else -1, int(second.max()))
+        for s in [s for s in self.buckets if s <= self.latest - self.seconds]:
+            del self.buckets[s]
+
+    # Returns the summary of one second, creating it if necessary
+    def getBucket(self, second):
+        if second not in self.buckets:
+            bucket = {}
+            for t in types:
+                bucket[t + "Requests"] = 0
+                bucket[t + "Failed"] = 0
+            for k in middleware.lists:
+                bucket[k] = Sketch()
+            self.buckets[second] = bucket
+        return self.buckets[second]
+
+    # Returns throughput, success rate and percentiles of each request type over the window. The trace holds
+    # one in middleware.sampleInterval requests, so the throughput is scaled up to the middleware's
+    def report(self):
+        results = OrderedDict()
+        if len(self.buckets) == 0:
+            return results
+
+        # the newest second is usually still being written, leave it out unless it is all there is
+        seconds = [s for s in self.buckets if s < self.latest] or [self.latest]
+        buckets = [self.buckets[s] for s in seconds]
+
+        for t in types:
+            summary = OrderedDict()
+            requests = sum([b[t + "Requests"] for b in buckets])
+            failed = sum([b[t + "Failed"] for b in buckets])
+            sketches = dict([(f, mergeAll([b[t + f] for b in buckets])) for f in fields])
+            summary["throughput"] = requests * middleware.sampleInterval / len(seconds)
+            summary["success"] = 1 - failed / requests if requests > 0 else None
+            for f in fields:
+                for p in percentiles:
+                    summary[f + "P" + str(p)] = sketches[f].percentile(p)
+            results[t] = summary
+        return results
+
+# Returns a mask of the requests of each type in trace columns
+def getTypes(trace):
+    masks = OrderedDict()
+    masks["get"] = trace["type"] == middleware.requestTypes.index(b"READ")
+    masks["set"] = trace["type"] == middleware.requestTypes.index(b"WRITE")
+    masks["combined"] = np.ones(len(trace["type"]), dtype=bool)
+    return masks
+
+# Reads lines as they are appended to a log, starting over if it is truncated or replaced
+class Follower(object):
+    def __init__(self, log, fromEnd=False):
+        self.log = log
+        self.file = None
+        self.partial = ""
+        self.fromEnd = fromEnd
+
+    # Returns the complete lines appended since the last call
+    def readLines(self):
+        if self.file is None:
+            if not os.path.exists(self.log):
+                return []
+            self.file = open(self.log, "r")
+            if self.fromEnd:
+                self.file.seek(0, os.SEEK_END)
+        elif os.stat(self.log).st_size < self.file.tell():
+            self.file.close()
+            self.file = None
+            self.partial = ""
+            self.fromEnd = False
+            return self.readLines()
+
+        lines = (self.partial + self.file.read()).split("\n")
+        self.partial = lines.pop()
+        return [l for l in lines if len(l) > 0 and l[0] != "#"]
+
+# Prints a report to stdout
+def show(report, windowSeconds):
+    print(time.strftime("%H:%M:%S") + " - last {:d} s".format(windowSeconds))
+    for (t, summary) in report.items():
+        line = "    {:<8s} {:>10,.0f} ops/s".format(t, summary["throughput"])
+        if summary["success"] is not None:
+            line = line + "  {:6.2f}% ok".format(summary["success"] * 100)
+        for f in fields:
+            line = line + "  " + f + " " + "/".join(["{:.6f}".format(summary[f + "P" + str(p)]) for p in percentiles])
+        print(line)
+    sys.stdout.flush()
+
+# Appends a report to a CSV file, writing the header first if the file is new
+def export(report, csvFile):
+    columns = ["throughput", "success"] + [f + "P" + str(p) for f in fields for p in percentiles]
+    newFile = not os.path.exists(csvFile)
+    with open(csvFile, "a") as f:
+        if newFile:
+            f.write(",".join(["time", "type"] + columns) + "\n")
+        for (t, summary) in report.items():
+            f.write(",".join([str(time.time()), t] + ["" if summary[c] is None else str(summary[c]) for c in columns]) + "\n")
+
+# Follow a log forever, reporting every interval seconds
+def follow(log, windowSeconds=30, interval=5, csvFile=None, fromEnd=False):
+    window = Window(windowSeconds)
+    follower = Follower(log, fromEnd)
+    lastReport = time.time()
+
+    while True:
+        lines = follower.readLines()
+        if len(lines) > 0:
+            window.add(middleware.parseText(lines))
+        else:
+            time.sleep(poll)
+
+        if time.time() - lastReport >= interval:
+            lastReport = time.time()
+            report = window.report()
+            if len(report) > 0:
+                show(report, windowSeconds)
+                if csvFile is not None: export(report, csvFile)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rolling-window metrics of a middleware log that is still being written")
+    parser.add_argument("log", help="path to middleware.log")
+    parser.add_argument("--window", type=int, default=30, help="window length in seconds of trace time")
+    parser.add_argument("--interval", type=float, default=5, help="seconds between reports")
+    parser.add_argument("--csv", default=None, help="also append every report to this CSV file")
+    parser.add_argument("--from-end", action="store_true", help="ignore the lines already in the log")
+    args = parser.parse_args()
+
+    try:
+        follow(args.log, args.window, args.interval, args.csv, args.from_end)
+    except KeyboardInterrupt:
+        pass
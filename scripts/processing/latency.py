@@ -0,0 +1,105 @@
+# Tail latency and SLO violations of an experiment, from the client (memaslap) and middleware side
+import numpy as np
+
+# memaslap only reports a mean response time per period and machine, so its tail is that of the interval means
+# in the {k}RtStacked arrays of memaslap.combineRuns() (rows (x, mean, std, machine), over every run), and its
+# violations are the fraction of intervals with a mean above the SLO. The middleware logs every request, so its
+# tail and violations are per request, estimated from the sketches of middleware.process(). Putting both in one
+# flat row per experiment shows at once whether a slower tail comes from inside the middleware or not.
+
+percentiles = [50, 90, 99, 99.9]
+slo = 0.010 # response time (s) not to be exceeded
+tolerance = 0.1 # relative increase of a tail value over its baseline reported by regressions()
+
+# Returns a list of (percentile, value) of an array of values
+def getPercentiles(values, percentiles=percentiles):
+    values = np.asarray(values, dtype=float)
+    if len(values) == 0:
+        return [(p, np.nan) for p in percentiles]
+    return list(zip(percentiles, np.percentile(values, percentiles)))
+
+# Returns the fraction of an array of values above slo
+def getViolations(values, slo=slo):
+    values = np.asarray(values, dtype=float)
+    if len(values) == 0:
+        return np.nan
+    return float(np.count_nonzero(values > slo) / len(values))
+
+# Name of a percentile, e.g. p99.9
+def label(p):
+    return "p" + format(p, "g")
+
+# Column name of a tail value in a row, e.g. memaslapP99.9
+def column(prefix, name):
+    return prefix + name[0].upper() + name[1:]
+
+# Tail of the interval response times of memaslap results (see memaslap.combineRuns), for all machines together
+# under "all" and for each machine under its name (see memaslap.mergeMachines, its index if the runs used
+# different machines, as machine{index}): a dictionary of percentile label -> value, "violations" and "intervals"
+def memaslapTail(results, requestType="combined", slo=slo, percentiles=percentiles):
+    stacked = np.asarray(results[requestType + "RtStacked"], dtype=float)
+    machines = stacked[:, 3].astype(int) if stacked.shape[1] > 3 else np.zeros(len(stacked), dtype=int)
+    names = results.get("machineNames")
+
+    tail = {"all": getTail(stacked[:, 1], slo, percentiles)}
+    for m in np.unique(machines):
+        tail[names[m] if names is not None else "machine" + str(m)] = getTail(stacked[machines == m, 1], slo, percentiles)
+    return tail
+
+# Percentiles, violations and number of an array of response times
+def getTail(values, slo=slo, percentiles=percentiles):
+    tail = dict([(label(p), v) for (p, v) in getPercentiles(values, percentiles)])
+    tail["violations"] = getViolations(values, slo)
+    tail["intervals"] = len(values)
+    return tail
+
+# Tail of the per-request times of middleware results (see middleware.process) for one field (Tmw, Tqueue or
+# Tserver): a dictionary of percentile label -> value, "violations" and "requests"
+def middlewareTail(results, requestType="combined", field="Tmw", slo=slo, percentiles=percentiles):
+    sketch = results[requestType + field + "Sketch"]
+    tail = dict([(label(p), sketch.percentile(p)) for p in percentiles])
+    tail["violations"] = sketch.above(slo)
+    tail["requests"] = sketch.count
+    return tail
+
+# One flat row with the tail of an experiment: memaslap{label} and memaslapViolations over all machines,
+# {name}{label} and {name}Violations for each machine (e.g. mema0P99), worstMachine (the name of the one with the
+# highest top percentile),
+# and middleware{label} and middlewareViolations of the per-request middleware time if middlewareResults is given
+def tail(memaslapResults, middlewareResults=None, requestType="combined", slo=slo, percentiles=percentiles):
+    row = {"slo": slo}
+    clients = memaslapTail(memaslapResults, requestType, slo, percentiles)
+    for (k, v) in clients.pop("all").items():
+        row[column("memaslap", k)] = v
+
+    top = label(max(percentiles))
+    for (m, machine) in sorted(clients.items()):
+        for (k, v) in machine.items():
+            row[column(m, k)] = v
+    row["worstMachine"] = max(clients, key=lambda m: clients[m][top]) if clients else None
+
+    if middlewareResults is not None:
+        for (k, v) in middlewareTail(middlewareResults, requestType, "Tmw", slo, percentiles).items():
+            row[column("middleware", k)] = v
+    return row
+
+# Compare two rows from tail() of the same experiment, returns a list of (column, baseline, current) for every
+# percentile or violation fraction that grew by more than tolerance (relative) over its baseline
+def regressions(baseline, current, tolerance=tolerance, percentiles=percentiles):
+    suffixes = tuple([column("", label(p)) for p in percentiles] + ["Violations"])
+    found = []
+    for k in current:
+        if k.endswith(suffixes) and k in baseline and current[k] > baseline[k] * (1 + tolerance) and current[k] > 0:
+            found.append((k, baseline[k], current[k]))
+    return found
+
+# Prints a row from tail() to stdout
+def show(row):
+    names = [k[len("memaslap"):] for k in row if k.startswith("memaslapP")]
+    print(" Tail latency (SLO {:,.6f} s)".format(row["slo"]))
+    for source in ["memaslap", "middleware"]:
+        if source + "Violations" in row:
+            print("    {:<10s} ".format(source) + "  ".join(["{:s} {:,.6f} s".format(n.lower(), row[source + n]) for n in names])
+                  + "  violations {:.2%}".format(row[source + "Violations"]))
+    print("    worst machine: {}".format(row["worstMachine"]))
+    print()
@@ -1,18 +1,52 @@
 # Handle memaslap logs
 import re
+import gzip
+import numpy as np
 from numpy import mean, sqrt, square, std
 from pathlib import Path
+from parallel import parallelMap
+import steady
+import stats
 
 rtScale = 1000000
+lists = ["getTps", "getRt", "setTps", "setRt", "combinedTps", "combinedRt"]
+logPatterns = ["mema*.log", "mema*.log.gz"]
+initialRows = 64 # rows preallocated for each periodic series, grown as needed
+steadyState = False # trim warm-up and cool-down with steady.getWindow on each run's total throughput, otherwise drop the first and last periodic samples
+steadyBatch = 1 # periodic samples per MSER batch, runs only have a few dozen samples
+stragglerLevel = 0.99 # confidence that a straggler's response time does not belong with the other machines', see stats.outliers
+
+# memaslap's section names and the prefixes used for them in results
+prefixes = {"Get": "get", "Set": "set", "Total": "combined"}
+
+# Line grammar of a memaslap log, each named group is a token. Section headers move the parser into
+# a state that decides which of the following lines are read: periodic sections ("Get Statistics")
+# are followed by a single "Period" line, final sections ("Get Statistics (n events)") by "Avg:" and "Std:"
+linePattern = re.compile(r"(?P<final>(?P<finalType>Get|Set|Total) Statistics \()"
+                         r"|(?P<periodic>(?P<periodicType>Get|Set|Total) Statistics\s*$)"
+                         r"|(?P<period>Period\s)"
+                         r"|(?P<avg>\s*Avg:)"
+                         r"|(?P<std>\s*Std:)"
+                         r"|(?P<getOps>cmd_get: )"
+                         r"|(?P<setOps>cmd_set: )"
+                         r"|(?P<runTime>Run time: )")
 
 # directory must be a Path object, runs is an integer, returns a list of lists of string log paths
 def getLogs(base, directory, runs):
-    return [[str(l) for l in (base / directory.format(run=r)).glob("mema*.log")] for r in range(0, runs)]
+    return [findLogs(base / directory.format(run=r)) for r in range(0, runs)]
 
-# Combine multiple runs into a single set of results - takes a list of lists of logs and assumes 5 runs for CI calculation
-def process(runs, tValue=2.776):
-    intermediate = combineRuns(runs)
-    
+# directory must be a Path object, returns a list of string paths to the plain or gzipped memaslap logs in it
+def findLogs(directory):
+    return sorted([str(l) for p in logPatterns for l in directory.glob(p)])
+
+# Combine multiple runs into a single set of results - takes a list of lists of logs, confidence intervals use the
+# t-quantile for the number of samples unless tValue is given
+# workers is the number of processes reading logs, see parallel.workers for the default
+def process(runs, tValue=None, workers=None):
+    return summarise(combineRuns(runs, workers), tValue)
+
+# Turn the output of combineRuns() or mergeRuns() into the final results returned by process()
+def summarise(intermediate, tValue=None):
     results = {}
     
     # aggregate using specific function depending on data    
@@ -30,16 +64,35 @@ def process(runs, tValue=2.776):
     for k in ["getRtFinal", "setRtFinal", "combinedRtFinal", "combinedTpsFinal", "combinedTotalOps", "setTotalOps", "getTotalOps", "totalRuntime"]:
         if k in intermediate: results[k] = intermediate[k]
     
+    # per-machine breakdown
+    for k in ["machineNames", "machineTps", "machineRt", "machineRtError", "tpsImbalance", "rtStragglers", "stragglerRuns"]:
+        if k in intermediate: results[k] = intermediate[k]
+    
     return results
 
-# Returns the 95% confidence interval of a sample assuming 5 runs
-def cInterval(samples, tValue):
-    return tValue * (std(samples) / sqrt(len(samples)))
+# Returns the half width of the 95% confidence interval of the mean of a sample, see stats.meanCI
+def cInterval(samples, tValue=None):
+    return stats.meanCI(samples, tValue=tValue)[1]
 
 # Combine multiple runs into a single set of results - takes a list of lists of logs
-def combineRuns(runs):
+def combineRuns(runs, workers=None):
+    return mergeRuns(readRuns(runs, workers))
+
+# Returns the combineMachines() results of each run that has logs, reading the logs of all runs in one go
+def readRuns(runs, workers=None):
+    runs = [r for r in runs if len(r) > 0]
+    
+    machines = parallelMap(read, [l for r in runs for l in r], workers)
+    intermediate = []
+    for r in runs:
+        intermediate.append(mergeMachines(machines[:len(r)]))
+        machines = machines[len(r):]
+    
+    return intermediate
+
+# Combine the combineMachines() results of multiple runs into a single set of results
+def mergeRuns(intermediate):
     results = {}
-    intermediate = [combineMachines(r) for r in runs if len(r) > 0]
 
     # aggregate using specific function depending on data    
     for k in ["getTps", "setTps", "combinedTps"]:
@@ -59,12 +112,24 @@ def combineRuns(runs):
     results["getTotalOps"] = mean([x["getTotalOps"] for x in intermediate])
     results["totalRuntime"] = mean([x["totalRuntime"] for x in intermediate])
     
+    # average the per-machine breakdown if every run used the same machines, and count the runs each was a straggler in
+    if all(["machineRtError" in x for x in intermediate]) and len(set([tuple(x["machineNames"]) for x in intermediate])) == 1:
+        results["machineNames"] = intermediate[0]["machineNames"]
+        results["machineTps"] = mean([x["machineTps"] for x in intermediate], axis=0)
+        results["machineRt"] = mean([x["machineRt"] for x in intermediate], axis=0)
+        results["machineRtError"] = sqrt(np.sum(square([x["machineRtError"] for x in intermediate]), axis=0)) / len(intermediate)
+        results.update(getImbalance(results["machineNames"], results["machineTps"], results["machineRt"], results["machineRtError"]))
+        results["stragglerRuns"] = [sum([n in x["rtStragglers"] for x in intermediate]) for n in results["machineNames"]]
+    
     return results
 
 # Combine periodic measurements from many machines into a single list
-def combineMachines(logs):
+def combineMachines(logs, workers=None):
+    return mergeMachines(parallelMap(read, logs, workers))
+
+# Combine the results of read() for many machines into a single set of results
+def mergeMachines(intermediate):
     results = {}
-    intermediate = [read(l) for l in logs]
 
     # aggregate using specific function depending on data    
     for k in ["getTps", "setTps", "combinedTps"]:
@@ -73,7 +138,7 @@ def combineMachines(logs):
         if k in intermediate[0]:
             data = [x[k] for x in intermediate]
             results[k] = aggregateRt(data)
-            results[k + "Stacked"] = stackRt(data)
+            results[k + "Stacked"] = stackRt([labelMachine(d, i) for (i, d) in enumerate(data)])
         
     # average the averages, but RMS the stddevs
     for k in ["getRtFinal", "setRtFinal", "combinedRtFinal"]:
@@ -86,132 +151,158 @@ def combineMachines(logs):
     results["getTotalOps"] = sum([x["getTotalOps"] for x in intermediate])
     results["totalRuntime"] = mean([x["totalRuntime"] for x in intermediate])
     
+    # per-machine breakdown, to find the machines skewing the aggregates
+    results["machineNames"] = [x.get("machine", str(i)) for (i, x) in enumerate(intermediate)]
+    results["machineTps"] = np.array([x["combinedTpsFinal"] for x in intermediate], dtype=float)
+    results["machineRt"] = np.array([x["combinedRtFinal"][0] if "combinedRtFinal" in x else np.nan for x in intermediate])
+    results["machineRtError"] = np.array([x["combinedRtFinal"][1] / sqrt(max(1, x["combinedTotalOps"])) if "combinedRtFinal" in x else np.nan for x in intermediate])
+    results.update(getImbalance(results["machineNames"], results["machineTps"], results["machineRt"], results["machineRtError"]))
+    
+    # keep the steady part of the run, the same periods for every machine and series
+    if steadyState and "combinedTps" in results:
+        results["window"] = getWindow(results["combinedTps"])
+        for k in lists:
+            for key in [k, k + "Stacked"]:
+                if key in results:
+                    x = results[key][:, 0]
+                    results[key] = results[key][(x >= results["window"][0]) & (x < results["window"][1])]
+    
     return results
 
-# aggregate a list of lists of (x, mean, std) tuples into a single list of tuples (x, mean(mean), rms(std))
+# Imbalance between machines from their throughput and response time (with its standard error): "tpsImbalance" is
+# the coefficient of variation of the throughput, "rtStragglers" the names of the machines whose response time is
+# an outlier among the machines' at level (see stats.outliers, needs at least three machines)
+def getImbalance(names, tps, rt, rtError=None, level=None):
+    if level is None: level = stragglerLevel
+    imbalance = {}
+    imbalance["tpsImbalance"] = std(tps) / mean(tps) if mean(tps) > 0 else np.nan
+    imbalance["rtStragglers"] = [names[i] for i in stats.outliers(rt, rtError, level)]
+    return imbalance
+
+# Prints the per-machine breakdown of results from combineRuns(), mergeMachines() or summarise() to stdout
+def showMachines(results):
+    print(" Client machines (throughput imbalance {:.1%})".format(results["tpsImbalance"]))
+    for (i, n) in enumerate(results["machineNames"]):
+        straggler = ""
+        if n in results["rtStragglers"]: straggler = "  straggler"
+        if "stragglerRuns" in results: straggler = straggler + "  (straggler in {:d} of the runs)".format(results["stragglerRuns"][i])
+        print("    {:<12s} {:>12,.2f} ops/s  {:,.6f} s".format(n, results["machineTps"][i], results["machineRt"][i]) + straggler)
+    print()
+
+# Returns the range [start, end) of x values in the steady part of an array of rows (x, tps)
+def getWindow(tps):
+    (start, end) = steady.getWindow(tps[:, 1], steadyBatch)
+    if end <= start:
+        return (tps[0, 0], tps[-1, 0] + 1)
+    return (tps[start, 0], tps[end - 1, 0] + 1)
+
+# aggregate a list of (x, mean, std) arrays into a single array of rows (x, mean(mean), rms(std))
 def aggregateRt(data):
-    return [(data[0][y][0], mean([x[y][1] for x in data]), sqrt(mean(square([x[y][2] for x in data])))) for y in range(0, len(data[0]))]
+    data = stackSeries(data)
+    return np.column_stack((data[0, :, 0], mean(data[:, :, 1], axis=0), sqrt(mean(square(data[:, :, 2]), axis=0))))
 
-# stack a list of lists of (x, mean, std) tuples into a single list of tuples (x, mean, std)
+# stack a list of (x, mean, std, machine) arrays into a single array of rows (x, mean, std, machine)
 def stackRt(data):
-    newData = []
-    for d in data:
-        newData = newData + d
-    return newData
+    return np.concatenate(data)
+
+# add the index of the machine a (x, mean, std) array comes from as a last column
+def labelMachine(data, machine):
+    return np.column_stack((data, np.full(len(data), machine)))
 
-# aggregate a list of lists of (x, mean) tuples into a single list of tuples (x, sum(mean))
+# aggregate a list of (x, mean) arrays into a single array of rows (x, sum(mean))
 def machine_aggregateTps(data):
-    return [(data[0][y][0], sum([x[y][1] for x in data])) for y in range(0, len(data[0]))]
+    data = stackSeries(data)
+    return np.column_stack((data[0, :, 0], data[:, :, 1].sum(axis=0)))
     
-# aggregate a list of lists of (x, sum) tuples into a single list of tuples (x, mean(sum))
+# aggregate a list of (x, sum) arrays into a single array of rows (x, mean(sum))
 def run_aggregateTps(data):
-    return [(data[0][y][0], mean([x[y][1] for x in data])) for y in range(0, len(data[0]))]
+    data = stackSeries(data)
+    return np.column_stack((data[0, :, 0], mean(data[:, :, 1], axis=0)))
 
-# Reads a specified memaslap log file into an in-memory dictionary
-def read(log):
-    readX = 0
-    writeX = 0
-    totalX = 0
+# stack a list of periodic series into one 3D array, cut to the shortest series
+def stackSeries(data):
+    rows = min([len(d) for d in data])
+    return np.stack([np.asarray(d)[:rows] for d in data])
 
+# Reads a specified memaslap log file (optionally gzipped) into an in-memory dictionary in a single pass
+def read(log):
     results = {}
+    series = {}
     
-    # initialise all lists
-    lists = ["getTps", "getRt", "setTps", "setRt", "combinedTps", "combinedRt"]
-    for k in lists:
-        results[k] = []
-    
-    f = open(log, "r")
-    for line in f:
-        #-------------------------------------------------------------
-        if line.startswith("Get Statistics ("):
-            next(f)
-            next(f)
-            line = next(f)
-            split = re.split(" +", line)
-            rtAvFinal = float(split[2]) / rtScale
-            
-            next(f)
-            line = next(f)
-            split = re.split(" +", line)
-            rtStdFinal = float(split[2]) / rtScale
-            
-            results["getRtFinal"] = (rtAvFinal, rtStdFinal)
-        #-------------------------------------------------------------
-        elif line.startswith("Set Statistics ("):
-            next(f)
-            next(f)
-            line = next(f)
-            split = re.split(" +", line)
-            rtAvFinal = float(split[2]) / rtScale
-            
-            next(f)
-            line = next(f)
-            split = re.split(" +", line)
-            rtStdFinal = float(split[2]) / rtScale
-            
-            results["setRtFinal"] = (rtAvFinal, rtStdFinal)
-        #-------------------------------------------------------------
-        elif line.startswith("Total Statistics ("):
-            next(f)
-            next(f)
-            line = next(f)
-            split = re.split(" +", line)
-            rtAvFinal = float(split[2]) / rtScale
-            
-            next(f)
-            line = next(f)
-            split = re.split(" +", line)
-            rtStdFinal = float(split[2]) / rtScale
-            
-            results["combinedRtFinal"] = (rtAvFinal, rtStdFinal)
-        #-------------------------------------------------------------
-        elif line.startswith("Get Statistics"):
-            ## skip two lines
-            next(f)
-            line = next(f)
-            
-            split = re.split(" +", line)
-            results["getTps"].append((readX, int(split[3])))
-            results["getRt"].append((readX, float(split[8]) / rtScale, float(split[9]) / rtScale))
-            readX = readX + int(split[1])
-        #-------------------------------------------------------------
-        elif line.startswith("Set Statistics"):
-            # skip two lines    
-            next(f)
-            line = next(f)
-            
-            split = re.split(" +", line)
-            results["setTps"].append((writeX, int(split[3])))
-            results["setRt"].append((writeX, float(split[8]) / rtScale, float(split[9]) / rtScale))
-            writeX = writeX + int(split[1])
-        #-------------------------------------------------------------
-        elif line.startswith("Total Statistics"):
-            # skip two lines
-            next(f)
-            line = next(f)
+    # x position of the next periodic sample of each request type
+    position = {}
+    for p in prefixes.values():
+        position[p] = 0
+    
+    # the current state is the section whose lines are being read, if any
+    state = None
+    
+    with openLog(log) as f:
+        for line in f:
+            match = linePattern.match(line)
+            if match is None:
+                continue
             
-            split = re.split(" +", line)
-            results["combinedTps"].append((totalX, int(split[3])))
-            results["combinedRt"].append((totalX, float(split[8]) / rtScale, float(split[9]) / rtScale))
-            totalX = totalX + int(split[1])
-        #-------------------------------------------------------------
-        elif line.startswith("cmd_get: "):
-            results["getTotalOps"] = int(re.split(" +", line)[1])
-        #-------------------------------------------------------------
-        elif line.startswith("cmd_set: "):
-            results["setTotalOps"] = int(re.split(" +", line)[1])
-        #-------------------------------------------------------------
-        elif line.startswith("Run time: "):
-            split = re.split(" +", line)
-            results["combinedTpsFinal"] = int(split[6])
-            results["combinedTotalOps"] = int(split[4])
-            results["totalRuntime"] = float(split[2].rstrip("s"))
-    
-    # make sure empty lists are set to none
+            token = match.lastgroup
+            #-------------------------------------------------------------
+            if token == "final":
+                state = ("final", prefixes[match.group("finalType")], None)
+            #-------------------------------------------------------------
+            elif token == "periodic":
+                state = ("periodic", prefixes[match.group("periodicType")])
+            #-------------------------------------------------------------
+            elif token == "period" and state is not None and state[0] == "periodic":
+                split = line.split()
+                p = state[1]
+                appendRow(series, p + "Tps", (position[p], int(split[3])))
+                appendRow(series, p + "Rt", (position[p], float(split[8]) / rtScale, float(split[9]) / rtScale))
+                position[p] = position[p] + int(split[1])
+                state = None
+            #-------------------------------------------------------------
+            elif token == "avg" and state is not None and state[0] == "final":
+                state = ("final", state[1], float(line.split()[1]) / rtScale)
+            #-------------------------------------------------------------
+            elif token == "std" and state is not None and state[0] == "final" and state[2] is not None:
+                results[state[1] + "RtFinal"] = (state[2], float(line.split()[1]) / rtScale)
+                state = None
+            #-------------------------------------------------------------
+            elif token == "getOps":
+                results["getTotalOps"] = int(line.split()[1])
+            #-------------------------------------------------------------
+            elif token == "setOps":
+                results["setTotalOps"] = int(line.split()[1])
+            #-------------------------------------------------------------
+            elif token == "runTime":
+                split = line.split()
+                results["combinedTpsFinal"] = int(split[6])
+                results["combinedTotalOps"] = int(split[4])
+                results["totalRuntime"] = float(split[2].rstrip("s"))
+    
+    # drop the first and last periodic samples (unless steady state is detected once the machines are merged),
+    # lists that were never filled are left out
     for k in lists:
-        if len(results[k]) > 0:
-            results[k] = results[k][1:-1]
-        else:
-            results.pop(k)
+        if k in series:
+            (data, rows) = series[k]
+            results[k] = data[:rows] if steadyState else data[:rows][1:-1]
     
+    results["machine"] = Path(str(log)).name.split(".")[0]
     return results
+
+# Opens a memaslap log for reading as text, transparently decompressing .gz files
+def openLog(log):
+    if str(log).endswith(".gz"):
+        return gzip.open(log, "rt")
+    return open(log, "r")
+
+# Appends a row to a growable array in series, stored as key: (array, rows used)
+def appendRow(series, key, row):
+    if key not in series:
+        series[key] = (np.empty((initialRows, len(row))), 0)
+    (data, rows) = series[key]
+    
+    # double the capacity when the preallocated array is full
+    if rows == len(data):
+        data = np.concatenate((data, np.empty_like(data)))
+    
+    data[rows] = row
+    series[key] = (data, rows + 1)
@@ -1,110 +1,501 @@
 # Handle middleware logs
 
 import re
-from numpy import mean, sqrt, square, std, percentile, histogram
+import os
+import sys
+import gzip
+import itertools
+from collections import Counter
+import numpy as np
+from numpy import mean, sqrt, square, std
+from parallel import parallelMap
+from sketch import Sketch, mergeAll
+import steady
+import stats
 
 lists = ["getTmw", "getTqueue", "getTserver", "setTmw", "setTqueue", "setTserver", "combinedTmw", "combinedTqueue", "combinedTserver"] 
 percentiles = [0, 25, 50, 75, 95, 100]
 bins = 5
 scale = 1000000000
-trimEdges = 0 # percentage to remove from either end of the data
+trimEdges = 0 # fraction of the trace duration to remove from either end of the data
+steadyState = False # only keep requests arriving in the steady window found by steady.getWindow on the throughput
+steadyResolution = 1.0 # seconds per throughput sample used for steady state detection
+steadyBatch = 5 # throughput samples per MSER batch (MSER-5)
+keepSamples = False # also return every sample under the keys in lists, otherwise only their sketches are kept
+seriesPercentiles = [50, 95, 99] # percentiles computed per time bucket by timeSeries()
+sampleInterval = 101 # requests of each type per request in the trace, the middleware logs one after every Requests.SAMPLE_INTERVAL
+slowLevel = 0.99 # confidence that the slow servers' mean Tserver does not belong with the other servers', see stats.outliers
+hotKeys = 5 # number of most requested keys listed in the results
+
+# one line of the trace: type,Tmiddleware_in,Tmiddleware_out,Tqueue_in,Tqueue_out,Tserver_in,Tserver_out,Fsuccess,Nserver,Hkey
+# where Nserver is the index of the memcached server the request was sent to and Hkey the hash of its key
+traceDtype = np.dtype([("type", "S7"), ("timestamps", "i8", (6,)), ("success", "i1"), ("server", "i4"), ("keyHash", "i4")])
+# older traces end at Fsuccess, their requests are read with server -1
+oldTraceDtype = np.dtype([("type", "S7"), ("timestamps", "i8", (6,)), ("success", "i1")])
+# column pairs (in, out) within the timestamps of each measurement
+intervals = {"Tmw": (0, 1), "Tqueue": (2, 3), "Tserver": (4, 5)}
+# request types as they appear in the trace, stored by index in the binary format
+requestTypes = [b"READ", b"WRITE", b"UNKNOWN"]
+
+# Binary trace layout: magic, row count, then each column back to back (six int64 timestamp
+# columns, one int32 server column, one int32 key hash column, one uint8 type column, one uint8
+# success column). Converted traces sit next to the text log with binarySuffix appended and are
+# memory-mapped rather than parsed.
+binaryMagic = b"ASLTRC02"
+oldBinaryMagic = b"ASLTRC01" # still read: the same layout without the server and key hash columns
+binaryHeader = np.dtype([("magic", "S8"), ("rows", "<i8")])
+binarySuffix = ".bin"
+chunkRows = 1000000 # rows parsed or processed at once when streaming through a trace
 
 # directory must be a Path object, runs is an integer, returns a list of string log paths
 def getLogs(base, expdir, runs):
     return [str(base / expdir.format(run=r) / "middleware.log") for r in range(0, runs)]
 
 
-# Combine multiple runs into a single set of results by stacking
-def process(runs, tValue=2.776):
+# Combine multiple runs into a single set of results by merging their sketches
+# workers is the number of processes reading logs, see parallel.workers for the default
+def process(runs, tValue=None, workers=None):
+    return mergeRuns(parallelMap(read, runs, workers), tValue)
+
+# Combine the read() results of multiple runs into a single set of results
+def mergeRuns(intermediate, tValue=None):
     results = {}
-    intermediate = [read(r) for r in runs]
     
-    # now we have a list of logs, stack them
+    # now we have a list of logs, merge them (and stack the samples if they were kept)
     for k in lists:
+        results[k + "Sketch"] = mergeAll([x[k + "Sketch"] for x in intermediate])
         if k in intermediate[0]: results[k] = stackLists([x[k] for x in intermediate])
     
     # calculate exp finals before we overwrite the run finals
     for k in lists:
-        results[k + "MeanExp"] = getMeanCI([intermediate[i][k + "Mean"] for (i, x) in enumerate(runs)], tValue)
+        results[k + "MeanExp"] = getMeanCI([x[k + "Mean"] for x in intermediate], tValue)
     
     # calculate stacked finals
     calculateFinals(results)
     
+    # merge the per-server sketches and key counts, unless some runs were read before they existed
+    if all(["perServer" in x for x in intermediate]):
+        results["duration"] = sum([x["duration"] for x in intermediate])
+        results["perServer"] = {}
+        for s in sorted(set([s for x in intermediate for s in x["perServer"]])):
+            runs = [x["perServer"][s] for x in intermediate if s in x["perServer"]]
+            results["perServer"][s] = dict([(k + "Sketch", mergeAll([r[k + "Sketch"] for r in runs])) for k in lists])
+        results["keyCounts"] = sum([x["keyCounts"] for x in intermediate], Counter())
+        results["keyServers"] = {}
+        for x in intermediate:
+            results["keyServers"].update(x["keyServers"])
+        calculateServerFinals(results)
+    
     return results
     
-# stack a list of lists into a single list
+# stack a list of arrays into a single array
 def stackLists(data):
-    newData = []
-    for d in data:
-        newData = newData + d
-    return newData
+    return np.concatenate(data)
+
+# Loads the raw columns of a middleware log as a dictionary with "type" (index into requestTypes),
+# "timestamps" (6 x n, one row per trace column), "success", "server" (-1 if the trace does not have it)
+# and "keyHash". Uses the binary version if it is up to date
+def loadTrace(log):
+    binary = findBinary(log)
+    if binary is not None:
+        return mapBinary(binary)
+    with openText(log) as f:
+        return parseText(f)
+
+# Yields the columns of a middleware log in chunks of at most rows requests, see loadTrace
+def traceChunks(log, rows=None):
+    if rows is None: rows = chunkRows
+    
+    binary = findBinary(log)
+    if binary is not None:
+        trace = mapBinary(binary)
+        for start in range(0, len(trace["type"]), rows):
+            yield dict([(k, v[..., start:start + rows]) for (k, v) in trace.items()])
+    else:
+        with openText(log) as f:
+            lines = (line for line in f if isRequest(line))
+            chunk = list(itertools.islice(lines, rows))
+            while len(chunk) > 0:
+                yield parseText(chunk)
+                chunk = list(itertools.islice(lines, rows))
+
+# Returns the path of the binary trace to use for a log, or None if the text has to be parsed
+def findBinary(log):
+    log = str(log)
+    if isBinary(log):
+        return log
+    if os.path.exists(log + binarySuffix) and os.path.getmtime(log + binarySuffix) >= os.path.getmtime(log):
+        return log + binarySuffix
+    return None
+
+# Opens a text middleware log, transparently decompressing .gz files
+def openText(log):
+    if str(log).endswith(".gz"):
+        return gzip.open(log, "rt")
+    return open(log, "r")
+
+# True for the lines of a text trace holding a request, as opposed to comments and blank lines
+def isRequest(line):
+    return line[:1] != "#" and line.strip() != ""
+
+# Parses text trace lines (a file name or an iterable of lines) into columns, see loadTrace. The number of columns
+# of the first line tells whether the trace has the server and key hash columns
+def parseText(lines):
+    if isinstance(lines, str):
+        with openText(lines) as f:
+            return parseText(f)
+    
+    lines = [line for line in lines if isRequest(line)]
+    hasServers = len(lines) > 0 and lines[0].count(",") == 9 # 10 columns, 8 in older traces
+    trace = np.loadtxt(lines, delimiter=",", dtype=traceDtype if hasServers else oldTraceDtype, ndmin=1)
+    
+    types = np.full(len(trace), requestTypes.index(b"UNKNOWN"), dtype=np.uint8)
+    for (i, t) in enumerate(requestTypes):
+        types[trace["type"] == t] = i
+    
+    columns = {"type": types, "timestamps": trace["timestamps"].T, "success": trace["success"].astype(np.uint8)}
+    columns["server"] = trace["server"] if hasServers else np.full(len(trace), -1, dtype=np.int32)
+    columns["keyHash"] = trace["keyHash"] if hasServers else np.zeros(len(trace), dtype=np.int32)
+    return columns
+
+# True if the file starts with the binary trace header
+def isBinary(path):
+    with open(path, "rb") as f:
+        return f.read(len(binaryMagic)) in [binaryMagic, oldBinaryMagic]
+
+# Memory-maps the columns of a binary trace without reading them, see loadTrace
+def mapBinary(path):
+    header = np.fromfile(path, dtype=binaryHeader, count=1)[0]
+    rows = int(header["rows"])
+    hasServers = header["magic"] == binaryMagic
+    offset = binaryHeader.itemsize
+    
+    # empty files cannot be mapped
+    if rows == 0:
+        return {"type": np.zeros(0, dtype=np.uint8), "timestamps": np.zeros((6, 0), dtype="<i8"), "success": np.zeros(0, dtype=np.uint8),
+                "server": np.zeros(0, dtype=np.int32), "keyHash": np.zeros(0, dtype=np.int32)}
+    
+    columns = {}
+    columns["timestamps"] = np.memmap(path, dtype="<i8", mode="r", offset=offset, shape=(6, rows))
+    offset = offset + 6 * 8 * rows
+    if hasServers:
+        columns["server"] = np.memmap(path, dtype="<i4", mode="r", offset=offset, shape=(rows,))
+        columns["keyHash"] = np.memmap(path, dtype="<i4", mode="r", offset=offset + 4 * rows, shape=(rows,))
+        offset = offset + 8 * rows
+    else:
+        columns["server"] = np.full(rows, -1, dtype=np.int32)
+        columns["keyHash"] = np.zeros(rows, dtype=np.int32)
+    columns["type"] = np.memmap(path, dtype=np.uint8, mode="r", offset=offset, shape=(rows,))
+    offset = offset + rows
+    columns["success"] = np.memmap(path, dtype=np.uint8, mode="r", offset=offset, shape=(rows,))
+    
+    return columns
 
-# Reads a specified middleware log file into an in-memory data structure
+# Converts a text middleware log (optionally gzipped) into the binary format, chunk by chunk, returns the binary
+# path. The binary is written to a temporary file moved into place once complete, so an interrupted conversion
+# never leaves a partial trace that findBinary would pick up.
+def convert(log, out=None):
+    log = str(log)
+    if out is None: out = log + binarySuffix
+    partial = out + ".partial"
+    
+    # count rows first so that each column can be laid out contiguously
+    with openText(log) as f:
+        rows = sum(1 for line in f if isRequest(line))
+    
+    header = np.zeros(1, dtype=binaryHeader)
+    header["magic"] = binaryMagic
+    header["rows"] = rows
+    size = binaryHeader.itemsize + rows * (6 * 8 + 2 * 4 + 2)
+    with open(partial, "wb") as f:
+        header.tofile(f)
+        f.truncate(size)
+    
+    if rows > 0:
+        offset = binaryHeader.itemsize
+        timestamps = np.memmap(partial, dtype="<i8", mode="r+", offset=offset, shape=(6, rows))
+        offset = offset + 6 * 8 * rows
+        servers = np.memmap(partial, dtype="<i4", mode="r+", offset=offset, shape=(rows,))
+        keyHashes = np.memmap(partial, dtype="<i4", mode="r+", offset=offset + 4 * rows, shape=(rows,))
+        offset = offset + 8 * rows
+        types = np.memmap(partial, dtype=np.uint8, mode="r+", offset=offset, shape=(rows,))
+        success = np.memmap(partial, dtype=np.uint8, mode="r+", offset=offset + rows, shape=(rows,))
+        
+        with openText(log) as f:
+            lines = (line for line in f if isRequest(line))
+            start = 0
+            while start < rows:
+                chunk = parseText(list(itertools.islice(lines, chunkRows)))
+                if len(chunk["type"]) == 0:
+                    raise ValueError(log + " changed while converting it, " + str(start) + " of " + str(rows) + " requests read")
+                end = start + len(chunk["type"])
+                timestamps[:, start:end] = chunk["timestamps"]
+                servers[start:end] = chunk["server"]
+                keyHashes[start:end] = chunk["keyHash"]
+                types[start:end] = chunk["type"]
+                success[start:end] = chunk["success"]
+                start = end
+        
+        for column in [timestamps, servers, keyHashes, types, success]:
+            column.flush()
+        del timestamps, servers, keyHashes, types, success
+    
+    os.replace(partial, out)
+    return out
+
+# Reads a specified middleware log file into sketches (and samples, if keepSamples is set), chunk by chunk
 def read(log):
     results = {}
+    results["failed"] = 0
     
-    # initialise fields
+    sketches = {}
+    samples = {}
     for k in lists:
-        results[k] = []
-    results["failed"] = 0
-
-    f = open(log, "r")
-    for line in f:
-        if line[0] == "#":
-            next(f)
-
-        split = line.split(",")
-        if split[7].startswith("1"):
-            if split[0] == "READ":
-                results["getTmw"].append(max(1, int(split[2]) - int(split[1])) / scale)
-                results["getTqueue"].append(max(1, int(split[4]) - int(split[3])) / scale)
-                results["getTserver"].append(max(1, int(split[6]) - int(split[5])) / scale)
-            elif split[0] == "WRITE":
-                results["setTmw"].append(max(1, int(split[2]) - int(split[1])) / scale)
-                results["setTqueue"].append(max(1, int(split[4]) - int(split[3])) / scale)
-                results["setTserver"].append(max(1, int(split[6]) - int(split[5])) / scale)
-            results["combinedTmw"].append(max(1, int(split[2]) - int(split[1])) / scale)
-            results["combinedTqueue"].append(max(1, int(split[4]) - int(split[3])) / scale)
-            results["combinedTserver"].append(max(1, int(split[6]) - int(split[5])) / scale)
-        else:
-            results["failed"] = results["failed"] + 1
-    
-    
-    # remove warm up and cool down points
-    if trimEdges:
-        for k in lists:
-            results[k] = results[k][t:-t]
-            t = int(len(results[k]) * trimEdges)
+        sketches[k] = Sketch()
+        samples[k] = []
+    
+    # per memcached server sketches, requests per key hash, and the range of arrival times
+    servers = {}
+    results["keyCounts"] = Counter()
+    results["keyServers"] = {}
+    span = (None, None) # first and last arrival of the requests kept
+    
+    # remove warm up and cool down requests
+    window = getWindow(log)
+    results["window"] = window
+    
+    for trace in traceChunks(log):
+        if window is not None:
+            chunkArrivals = np.asarray(trace["timestamps"][0])
+            inWindow = (chunkArrivals >= window[0]) & (chunkArrivals < window[1])
+            trace = dict([(k, v[..., inWindow]) for (k, v) in trace.items()])
+        
+        results["failed"] = results["failed"] + int(np.count_nonzero(trace["success"] != 1))
+        
+        durations = getDurations(trace)
+        for (k, values) in durations.items():
+            sketches[k].add(values)
+            if keepSamples: samples[k].append(values)
+        
+        for (s, split) in splitServers(trace, durations).items():
+            if s not in servers: servers[s] = dict([(k, Sketch()) for k in lists])
+            for (k, values) in split.items():
+                servers[s][k].add(values)
+        countKeys(trace, results["keyCounts"], results["keyServers"])
+        
+        if len(trace["type"]) > 0:
+            first = int(np.min(trace["timestamps"][0]))
+            last = int(np.max(trace["timestamps"][0]))
+            span = (first if span[0] is None else min(first, span[0]), last if span[1] is None else max(last, span[1]))
+    
+    for k in lists:
+        results[k + "Sketch"] = sketches[k]
+        if keepSamples: results[k] = stackLists(samples[k] + [np.zeros(0)])
     
     # calculate run finals for convenience
     calculateFinals(results)
     
+    results["duration"] = (span[1] - span[0]) / scale if span[0] is not None else 0.0
+    results["perServer"] = dict([(s, dict([(k + "Sketch", servers[s][k]) for k in lists])) for s in sorted(servers)])
+    calculateServerFinals(results)
+    
     return results
 
-# Takes a standard dictionary, adds the finals to it
+# Returns the range [start, end) of arrival times (Tmiddleware_in) of the requests to keep in a log, or None
+# to keep them all. With steadyState set it is the steady window of the throughput per steadyResolution
+# seconds, which trimEdges then narrows by that fraction of its duration at either end.
+# Arrivals are read in a pass of their own, which is cheap for binary traces but parses text logs twice.
+def getWindow(log):
+    if not trimEdges and not steadyState:
+        return None
+    
+    arrivals = np.concatenate([np.asarray(trace["timestamps"][0]) for trace in traceChunks(log)] + [np.zeros(0, dtype=np.int64)])
+    if len(arrivals) == 0:
+        return None
+    (start, end) = (int(arrivals.min()), int(arrivals.max()) + 1)
+    
+    if steadyState:
+        width = int(steadyResolution * scale)
+        (first, last) = steady.getWindow(np.bincount((arrivals - start) // width), steadyBatch)
+        (start, end) = (start + first * width, min(end, start + last * width))
+    
+    trim = int((end - start) * trimEdges)
+    return (start + trim, end - trim)
+
+# Returns the durations (in seconds) of the successful requests in trace columns, keyed as in lists
+def getDurations(trace):
+    durations = {}
+    
+    # only successful requests are measured
+    success = trace["success"] == 1
+    timestamps = trace["timestamps"][:, success]
+    types = trace["type"][success]
+    isGet = types == requestTypes.index(b"READ")
+    isSet = types == requestTypes.index(b"WRITE")
+    
+    for (f, (tIn, tOut)) in intervals.items():
+        values = np.maximum(1, timestamps[tOut] - timestamps[tIn]) / scale
+        durations["get" + f] = values[isGet]
+        durations["set" + f] = values[isSet]
+        durations["combined" + f] = values
+    
+    return durations
+
+# Splits durations from getDurations(trace) by the memcached server each request was sent to, returns a dictionary
+# of server index -> durations keyed as in lists. Requests without a server (older traces) are left out
+def splitServers(trace, durations):
+    success = trace["success"] == 1
+    servers = np.asarray(trace["server"])[success]
+    types = trace["type"][success]
+    typeServers = {"get": servers[types == requestTypes.index(b"READ")], "set": servers[types == requestTypes.index(b"WRITE")], "combined": servers}
+    
+    split = {}
+    for s in np.unique(servers[servers >= 0]):
+        split[int(s)] = dict([(k, values[typeServers[[x for x in typeServers if k.startswith(x)][0]] == s]) for (k, values) in durations.items()])
+    return split
+
+# Adds the number of requests of each key hash in trace columns to keyCounts, and the server of each key to keyServers
+def countKeys(trace, keyCounts, keyServers):
+    known = np.asarray(trace["server"]) >= 0
+    (hashes, first, counts) = np.unique(np.asarray(trace["keyHash"])[known], return_index=True, return_counts=True)
+    servers = np.asarray(trace["server"])[known][first]
+    for (h, s, c) in zip(hashes.tolist(), servers.tolist(), counts.tolist()):
+        keyCounts[h] = keyCounts[h] + c
+        keyServers[h] = s
+
+# Bins the requests of a middleware log by arrival time (Tmiddleware_in) into buckets of resolution seconds,
+# counted from the first arrival. Returns a dictionary of arrays with one entry per bucket: "time" (bucket
+# start in seconds) and, for get, set and combined requests, Count (requests in the trace, which holds one in
+# sampleInterval), Throughput (requests/s through the middleware, i.e. scaled by sampleInterval), Success (fraction
+# of requests that succeeded) and, for each of Tmw, Tqueue and Tserver of successful requests, Mean and
+# Percentile (one column per entry of seriesPercentiles). Use resolution=10 to line up with memaslap's
+# periodic statistics, whose x values are also the start of each period.
+def timeSeries(log, resolution=1.0):
+    results = {}
+    trace = loadTrace(log)
+    
+    arrivals = np.asarray(trace["timestamps"][0])
+    if len(arrivals) == 0:
+        results["time"] = np.zeros(0)
+        return results
+    
+    buckets = ((arrivals - arrivals.min()) // int(resolution * scale)).astype(np.int64)
+    count = int(buckets.max()) + 1
+    results["time"] = np.arange(count) * resolution
+    
+    success = np.asarray(trace["success"]) == 1
+    types = np.asarray(trace["type"])
+    masks = {"get": types == requestTypes.index(b"READ"), "set": types == requestTypes.index(b"WRITE"), "combined": np.ones(len(types), dtype=bool)}
+    
+    for (t, inType) in masks.items():
+        requests = np.bincount(buckets[inType], minlength=count)
+        succeeded = np.bincount(buckets[inType & success], minlength=count)
+        results[t + "Count"] = requests
+        results[t + "Throughput"] = requests * sampleInterval / resolution
+        with np.errstate(invalid="ignore", divide="ignore"):
+            results[t + "Success"] = np.where(requests > 0, succeeded / requests, np.nan)
+    
+    durations = getDurations(trace)
+    successBuckets = buckets[success]
+    successTypes = types[success]
+    typeBuckets = {"get": successBuckets[successTypes == requestTypes.index(b"READ")], "set": successBuckets[successTypes == requestTypes.index(b"WRITE")], "combined": successBuckets}
+    
+    for k in lists:
+        t = [x for x in typeBuckets if k.startswith(x)][0]
+        values = durations[k]
+        sums = np.bincount(typeBuckets[t], weights=values, minlength=count)
+        counts = np.bincount(typeBuckets[t], minlength=count)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            results[k + "Mean"] = np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+        results[k + "Percentile"] = getBucketPercentiles(typeBuckets[t], values, count, seriesPercentiles)
+    
+    return results
+
+# Percentiles of values within each bucket as a (buckets x percentiles) array, interpolated like numpy.percentile
+def getBucketPercentiles(buckets, values, count, percentiles):
+    order = np.lexsort((values, buckets))
+    values = values[order]
+    counts = np.bincount(buckets, minlength=count)
+    starts = np.cumsum(counts) - counts
+    used = counts > 0
+    
+    results = np.full((count, len(percentiles)), np.nan)
+    for (i, p) in enumerate(percentiles):
+        rank = p / 100 * (counts[used] - 1)
+        low = np.floor(rank).astype(np.int64)
+        high = np.ceil(rank).astype(np.int64)
+        lowValues = values[starts[used] + low]
+        highValues = values[starts[used] + high]
+        results[used, i] = lowValues + (highValues - lowValues) * (rank - low)
+    
+    return results
+
+# Takes a standard dictionary, adds the finals to it, computed from the sketches
 def calculateFinals(results):
     for k in lists:
-        results[k + "Mean"] = getMean(results[k])
-        results[k + "Percentile"] = getPercentiles(results[k])
-        results[k + "Distribution"] = getDistribution(results[k])
+        results[k + "Mean"] = getMean(results[k + "Sketch"])
+        results[k + "Percentile"] = getPercentiles(results[k + "Sketch"])
+        results[k + "Distribution"] = getDistribution(results[k + "Sketch"])
 
-# Returns a (mean, std) tuple for a list of numbers    
-def getMean(data):
-    return (mean(data), std(data))
+# Takes results with per-server sketches (see read), adds the per-server finals. In each entry of "perServer" the finals
+# of calculateFinals, "requests" (in the trace, all types) and "share" of all requests, {t}QueueLength (mean number of
+# requests in its queues by Little's law, the trace being one in sampleInterval requests) and "topKeyShare" (share of its
+# requests on its most requested key). Across servers "serverImbalance" (coefficient of variation of their requests),
+# "slowServers" (mean combined Tserver an upward outlier among the servers', see stats.outliers) and "hotKeys"
+# (list of (key hash, server, share of all requests) of the hotKeys most requested keys). A slow server has a high
+# Tserver at an even share of the requests, a hot key a high share (and topKeyShare) at a normal Tserver.
+def calculateServerFinals(results):
+    servers = results["perServer"]
+    total = sum(results["keyCounts"].values())
+    
+    for (s, r) in servers.items():
+        calculateFinals(r)
+        keys = [c for (h, c) in results["keyCounts"].items() if results["keyServers"][h] == s]
+        r["requests"] = sum(keys)
+        r["share"] = r["requests"] / total if total > 0 else np.nan
+        r["topKeyShare"] = max(keys) / r["requests"] if r["requests"] > 0 else np.nan
+        for t in ["get", "set", "combined"]:
+            sketch = r[t + "TqueueSketch"]
+            r[t + "QueueLength"] = sampleInterval * sketch.mean * sketch.count / results["duration"] if results["duration"] > 0 else np.nan
+    
+    requests = np.array([servers[s]["requests"] for s in servers], dtype=float)
+    results["serverImbalance"] = std(requests) / mean(requests) if len(requests) > 0 and mean(requests) > 0 else np.nan
+    
+    names = list(servers)
+    tserver = np.array([servers[s]["combinedTserverMean"][0] for s in names])
+    errors = np.array([servers[s]["combinedTserverMean"][1] / sqrt(max(1, servers[s]["combinedTserverSketch"].count)) for s in names])
+    results["slowServers"] = [names[i] for i in stats.outliers(tserver, errors, slowLevel) if tserver[i] > mean(np.delete(tserver, i))]
+    
+    top = results["keyCounts"].most_common(hotKeys)
+    results["hotKeys"] = [(h, results["keyServers"][h], c / total) for (h, c) in top]
 
-# Returns the mean and 95% confidence interval of a sample as a (mean, ci) tuple
-def getMeanCI(samples, tValue):
-    m = mean([x[0] for x in samples])
-    ci = tValue * (std([x[1] for x in samples]) / sqrt(len(samples)))
-    return (m, ci)
+# Prints the per-server results of read() or process() to stdout
+def showServers(results):
+    print(" Memcached servers (request imbalance {:.1%}, slow: {:s})".format(results["serverImbalance"], ", ".join([str(s) for s in results["slowServers"]]) or "none"))
+    for (s, r) in results["perServer"].items():
+        print("    server {:<3d} share {:6.1%}  Tserver {:,.6f} s  p95 {:,.6f} s  queue {:,.2f}  top key {:.1%}".format(
+              s, r["share"], r["combinedTserverMean"][0], r["combinedTserverSketch"].percentile(95), r["combinedQueueLength"], r["topKeyShare"]))
+    for (h, s, share) in results["hotKeys"]:
+        print("    key {:>11d} on server {:d}: {:.2%} of requests".format(h, s, share))
+    print()
 
-# Returns a list of (percentile, value) for a list of numbers
-def getPercentiles(data):
-    return [(p, percentile(data, p)) for p in percentiles]
+# Returns a (mean, std) tuple for a sketch
+def getMean(sketch):
+    if sketch.count == 0:
+        return (np.nan, np.nan)
+    return (sketch.mean, sketch.std())
 
-# Returns a list of (bin_edge, count) for a list of numbers
-def getDistribution(data):
-    hist = histogram(data, bins=bins)
+# Returns the mean and 95% confidence interval of the per-run means in a list of (mean, std) as a (mean, ci) tuple
+def getMeanCI(samples, tValue=None):
+    return stats.meanCI([x[0] for x in samples], tValue=tValue)
+
+# Returns a list of (percentile, value) for a sketch, see sketch.Sketch for the error bound
+def getPercentiles(sketch):
+    return [(p, sketch.percentile(p)) for p in percentiles]
+
+# Returns a list of (bin_edge, count) for a sketch, see sketch.Sketch for the error bound
+def getDistribution(sketch):
+    hist = sketch.histogram(bins)
     
     newList = []
     for (i, x) in enumerate(hist[1][:-1]):
@@ -113,4 +504,8 @@ def getDistribution(data):
     return newList
     
     #return [(x, hist[0][i]) for (i, x) in enumerate(hist[1][:-1])]
-    
+
+# Convert the middleware logs given as arguments to the binary trace format
+if __name__ == "__main__":
+    for log in sys.argv[1:]:
+        print("Converting " + log + " to " + convert(log))
@@ -0,0 +1,21 @@
+# Spread log ingestion over several processes
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+workers = os.cpu_count() or 1 # default number of processes, 1 reads everything serially
+
+# Applies function to each item and returns the results in order. Items are handled in a pool of
+# worker processes unless there is only one item or one worker, in which case they are handled serially.
+# Workers are forked so they see the module settings (e.g. middleware.steadyState) as the caller set them,
+# whatever the platform's default start method.
+def parallelMap(function, items, processes=None):
+    items = list(items)
+    if processes is None: processes = workers
+    processes = min(processes, len(items))
+    
+    if processes <= 1:
+        return [function(i) for i in items]
+    
+    with ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("fork")) as executor:
+        return list(executor.map(function, items))
@@ -0,0 +1,43 @@
+# Figures of the milestone 2 part 1 report, rendered with report.py part1-report.py [group...]
+import process
+
+sweep = process.sweep
+grid = {"client": process.clients, "thread": process.threads}
+
+rtPercentile = (20, 320, [0, 25, 50, 75, 95, 100]) # number of threads, number of clients, percentiles
+rtDistribution = 320 # number of clients
+
+mwBreakdownThreads = 20 # number of threads
+mwBreakdownClients = 320 # number of clients
+mwPercentile = (20, 320) # threads, clients
+mwDistribution = (10, 360) # threads, clients
+mwServers = False # draw the per-server breakdown, only if the traces log the server and key of each request
+
+figures = [
+    {"group": "tps", "figure": process.plotThroughput, "experiments": grid, "metrics": ["memaslap"]},
+    {"group": "tps", "figure": process.plotTpsImbalance, "experiments": grid, "metrics": ["memaslap"]},
+
+    {"group": "rt", "figure": process.plotResponseTimePercentile, "args": {"threadCount": rtPercentile[0], "clientCount": rtPercentile[1], "percentiles": rtPercentile[2]},
+     "experiments": {"client": [rtPercentile[1]], "thread": [rtPercentile[0]]}, "metrics": ["memaslapRuns"]},
+    {"group": "rt", "figure": process.plotResponseTimeByClient, "experiments": grid, "metrics": ["memaslap"]},
+    {"group": "rt", "figure": process.plotResponseTimeDistribution, "args": {"clientCount": rtDistribution},
+     "experiments": {"client": [rtDistribution], "thread": process.threads}, "metrics": ["memaslapRuns"]},
+    {"group": "rt", "figure": process.plotTailByClient, "experiments": grid, "metrics": ["latency"]},
+
+    {"group": "mw", "figure": process.plotMwBreakdownBarsByClient, "args": {"threadCount": mwBreakdownThreads},
+     "experiments": {"client": process.clients, "thread": [mwBreakdownThreads]}, "metrics": ["middleware"]},
+    {"group": "mw", "figure": process.plotMwBreakdownBarsByThread, "args": {"clientCount": mwBreakdownClients},
+     "experiments": {"client": [mwBreakdownClients], "thread": process.threads}, "metrics": ["middleware"]},
+    {"group": "mw", "figure": process.plotMwPercentile, "args": {"threadCount": mwPercentile[0], "clientCount": mwPercentile[1]},
+     "experiments": {"client": [mwPercentile[1]], "thread": [mwPercentile[0]]}, "metrics": ["middleware"]},
+    {"group": "mw", "figure": process.plotMwDistribution, "args": {"threadCount": mwDistribution[0], "clientCount": mwDistribution[1]},
+     "experiments": {"client": [mwDistribution[1]], "thread": [mwDistribution[0]]}, "metrics": ["middleware"]},
+]
+
+if mwServers:
+    figures.append({"group": "mw", "figure": process.plotMwServers, "args": {"threadCount": mwPercentile[0], "clientCount": mwPercentile[1]},
+                    "experiments": {"client": [mwPercentile[1]], "thread": [mwPercentile[0]]}, "metrics": ["middleware"]})
+
+# the response time candlesticks, one figure per thread count
+figures.extend([{"group": "rt", "figure": process.plotResponseTimeHist, "args": {"t": t},
+                 "experiments": {"client": process.clients, "thread": [t]}, "metrics": ["memaslapRuns"]} for t in process.threads])
@@ -4,279 +4,200 @@
 import sys
 import os
 from pathlib import Path
-import Gnuplot, Gnuplot.funcutils
 from numpy import percentile, histogram
 
 # custom imports from "upstairs"
 sys.path.append("/home/eddy/uni/eth/asl/dev")
-import memaslap
-import middleware
+import render
+import report
+import latency
+from sweep import Sweep
 
 base = Path("/home/eddy/uni/eth/asl/dev/part1")
 expdir = "sec1-c{client}-v{thread}-r{run}"
+sweep = Sweep(base, expdir)
 clients = [120, 160, 200, 240, 280, 320, 360]
 threads = [10, 20, 30, 40]
-runs = 5
 
-def defaultPlot():
-    g = Gnuplot.Gnuplot()
-    g("set grid")
-    g("set yrange [0:]")
-    g("set xrange [0:]")
-    return g
-
-def plotThroughput():
-    g = defaultPlot()
-    g.title("Throughput as a Function of Total Clients")
-    g.xlabel("Total Clients")
-    g.ylabel("Throughput (operations/s)")
-    g("set key inside bottom right")
-    g("set xtic 40")
+# Every plot takes data, returning a processed dataset of an experiment as data(dataset, **params), see report.Report
+def plotThroughput(data):
+    series = []
     
     # create one line for each thread
     for t in threads:
         # go over all clients
         tTps = []
         for c in clients:
-            # create a list of lists with machines for each run
-            logs = [[str(l) for l in (base / expdir.format(client=c, thread=t, run=r)).glob("mema*.log")] for r in range(0, runs)]
-            results = memaslap.process(logs)
+            results = data("memaslap", client=c, thread=t)
             tTps.append((c, results["getTps"][0], results["getTps"][1]))
-        g._add_to_queue([Gnuplot.Data(tTps, title=(str(t) + " threads"), with_="yerrorbar lt " + str(t/10))])
-        g._add_to_queue([Gnuplot.Data(tTps, with_="lp lt " + str(t/10))])
+        series.append(render.series(tTps, title=(str(t) + " threads"), with_="yerrorbar lt " + str(t/10)))
+        series.append(render.series(tTps, with_="lp lt " + str(t/10)))
+    
+    return render.figure("tps-all-threads.png", "Throughput as a Function of Total Clients", "Total Clients", "Throughput (operations/s)",
+                         render.defaultCommands() + ["set key inside bottom right", "set xtic 40"], series)
+    
+def plotTpsImbalance(data):
+    series = []
+    
+    # create one line for each thread, with the stragglers of each experiment as labels
+    labels = []
+    for t in threads:
+        imbalance = []
+        for c in clients:
+            results = data("memaslap", client=c, thread=t)
+            imbalance.append((c, results["tpsImbalance"]))
+            if results["rtStragglers"]:
+                labels.append("set label " + render.quote(" ".join(results["rtStragglers"])) + " at " + str(c) + ", " + str(results["tpsImbalance"]) + " font ',8'")
+        series.append(render.series(imbalance, title=(str(t) + " threads"), with_="lp lt " + str(t/10)))
     
-    g.hardcopy(filename="tps-all-threads.png", terminal="png")
+    return render.figure("tps-imbalance.png", "Throughput Imbalance between Client Machines", "Total Clients", "Coefficient of Variation",
+                         render.defaultCommands() + ["set key inside top right", "set xtic 40"] + labels, series)
     
-def plotResponseTimeDistribution(clientCount):
-    g = defaultPlot()
-    g.title("Response Time Distribution with " + str(clientCount) + " Total Clients")
-    g.xlabel("Response Time (s)")
-    g.ylabel("Occurrences")
-    g("set key inside top left")
+def plotResponseTimeDistribution(data, clientCount):
+    series = []
     
     # create one line for each thread
     for (i, t) in enumerate(threads):
-        # create a list of lists with machines for each run
-        logs = [[str(l) for l in (base / expdir.format(client=clientCount, thread=t, run=r)).glob("mema*.log")] for r in range(0, runs)]
-        results = memaslap.combineRuns(logs)
+        results = data("memaslapRuns", client=clientCount, thread=t)
         
         hist = histogram([x[1] for x in results["getRtStacked"]], bins="auto")
         tmp = [(x, hist[0][i]) for (i, x) in enumerate(hist[1][:-1])]
         
-        g._add_to_queue([Gnuplot.Data(tmp, title=(str(t) + " threads"), with_="lp lt " + str(i + 1))])
+        series.append(render.series(tmp, title=(str(t) + " threads"), with_="lp lt " + str(i + 1)))
     
-    g.hardcopy(filename="rt-distribution.png", terminal="png")
+    return render.figure("rt-distribution.png", "Response Time Distribution with " + str(clientCount) + " Total Clients", "Response Time (s)", "Occurrences",
+                         render.defaultCommands() + ["set key inside top left"], series)
     
-def plotResponseTimeByClient():
-    g = defaultPlot()
-    g.title("Response Time as a Function of Total Clients")
-    g.xlabel("Total Clients")
-    g.ylabel("Response Time (s)")
-    g("set key inside top left")
-    g("set xtic 40")
-    g("unset yrange")
+def plotResponseTimeByClient(data):
+    series = []
         
     # create one line for each thread
     for t in threads:
         # go over all clients
         tTps = []
         for c in clients:
-            # create a list of lists with machines for each run
-            logs = [[str(l) for l in (base / expdir.format(client=c, thread=t, run=r)).glob("mema*.log")] for r in range(0, runs)]
-            results = memaslap.process(logs)
+            results = data("memaslap", client=c, thread=t)
             tTps.append((c, results["getRtStacked"][0], results["getRt"][1]))
-        g._add_to_queue([Gnuplot.Data(tTps, title=(str(t) + " threads"), with_="yerrorbar lt " + str(t/10))])
-        g._add_to_queue([Gnuplot.Data(tTps, with_="lp lt " + str(t/10))])
+        series.append(render.series(tTps, title=(str(t) + " threads"), with_="yerrorbar lt " + str(t/10)))
+        series.append(render.series(tTps, with_="lp lt " + str(t/10)))
     
-    g.hardcopy(filename="rt-all-threads.png", terminal="png")
+    return render.figure("rt-all-threads.png", "Response Time as a Function of Total Clients", "Total Clients", "Response Time (s)",
+                         render.defaultCommands() + ["set key inside top left", "set xtic 40", "unset yrange"], series)
     
-def plotResponseTimePercentile(threadCount, clientCount, percentiles):
-    g = defaultPlot()
-    g.title("Response Time Percentiles for Optimum Case")
-    g.xlabel("Percentile")
-    g.ylabel("Response Time (s)")
-    g("set key inside top left")
-    #g("set xtic 40")
+def plotResponseTimePercentile(data, threadCount, clientCount, percentiles):
+    results = data("memaslapRuns", client=clientCount, thread=threadCount)
     
-    # read data from logs only once
-    data = memaslap.combineRuns([[str(l) for l in (base / expdir.format(client=clientCount, thread=threadCount, run=r)).glob("mema*.log")] for r in range(0, runs)])
-    
-    tmp = []
-    for (i, p) in enumerate(percentiles):
-        tmp.append((p, percentile(clientData["getRtStacked"], p, axis=0)[1]))
+    tmp = latency.getPercentiles(results["getRtStacked"][:, 1], percentiles)
 
-    g._add_to_queue([Gnuplot.Data(tmp, with_="lp ls 1")])
-    g.hardcopy(filename="rt-opt-percentile.png", terminal="png")
+    return render.figure("rt-opt-percentile.png", "Response Time Percentiles for Optimum Case", "Percentile", "Response Time (s)",
+                         render.defaultCommands() + ["set key inside top left"], [render.series(tmp, with_="lp ls 1")])
     
-def plotMwBreakdownBarsByClient(threadCount):
-    g = Gnuplot.Gnuplot()
-    g.title("Middleware Time Breakdown with " + str(threadCount) + " Read Threads")
-    g.xlabel("Total Clients")
-    g.ylabel("Time (s)")
-    g("set key top left")
-    g("set grid ytics")
-    g("set style data histogram")
-    g("set style histogram errorbars gap 1")
-    g("set style fill pattern 0 border")
-    g("set auto x")
-    g("set xrange [-0.5:6.5]")
-    g("set xtics ('120' 0, '160' 1, '200' 2, '240' 3, '280' 4, '320' 5, '360' 6)")
+def plotTailByClient(data, p=99):
+    series = []
     
+    # create one line for each thread, on the client side and in the middleware
+    name = latency.column("", latency.label(p))
+    for t in threads:
+        tail = []
+        for c in clients:
+            results = data("latency", client=c, thread=t)
+            tail.append((c, results["memaslap" + name], results["middleware" + name]))
+        series.append(render.series(tail, title=(str(t) + " threads"), with_="lp lt " + str(t/10), using="1:2"))
+        series.append(render.series(tail, title=(str(t) + " threads (middleware)"), with_="lp dt 2 lt " + str(t/10), using="1:3"))
+    
+    return render.figure("rt-tail-threads.png", latency.label(p) + " Response Time as a Function of Total Clients (SLO " + str(latency.slo) + " s)",
+                         "Total Clients", "Response Time (s)", render.defaultCommands() + ["set key inside top left", "set xtic 40",
+                         "set arrow from graph 0, first " + str(latency.slo) + " to graph 1, first " + str(latency.slo) + " nohead dt 3"], series)
+    
+# commands shared by the middleware breakdown bar charts
+def barCommands(key, ticks):
+    return ["set key " + key, "set grid ytics", "set style data histogram", "set style histogram errorbars gap 1",
+            "set style fill pattern 0 border", "set auto x", "set xrange [-0.5:" + str(len(ticks) - 0.5) + "]",
+            "set xtics (" + ", ".join(["'" + str(t) + "' " + str(i) for (i, t) in enumerate(ticks)]) + ")"]
+
+def plotMwBreakdownBarsByClient(data, threadCount):
     # get data for all clients
-    data = {}
+    bars = {}
     fields = ["Tqueue", "Tserver", "Tmw"]
     for f in fields:
-        data[f] = []
+        bars[f] = []
     
     for c in clients:
-        # create a list of logs from the runs
-        logs = [str(base / expdir.format(client=c, thread=threadCount, run=r) / "middleware.log") for r in range(0, runs) if (base / expdir.format(client=c, thread=threadCount, run=r)).exists()]
-        results = middleware.process(logs)
+        results = data("middleware", client=c, thread=threadCount)
         for f in fields:
-            data[f].append((c, results["get" + f + "MeanExp"][0], results["get" + f + "MeanExp"][1]))
+            bars[f].append((c, results["get" + f + "MeanExp"][0], results["get" + f + "MeanExp"][1]))
     
-    for f in fields:
-        g._add_to_queue([Gnuplot.Data(data[f], title=f, using="2:3")])
-
-    g.hardcopy(filename="mw-time-clients.png", terminal="png")
+    return render.figure("mw-time-clients.png", "Middleware Time Breakdown with " + str(threadCount) + " Read Threads", "Total Clients", "Time (s)",
+                         barCommands("top left", clients), [render.series(bars[f], title=f, using="2:3") for f in fields])
 
-def plotMwBreakdownBarsByThread(clientCount):
-    g = Gnuplot.Gnuplot()
-    g.title("Middleware Time Breakdown with " + str(clientCount) + " Total Clients")
-    g.xlabel("Read Threads")
-    g.ylabel("Time (s)")
-    g("set key top right")
-    g("set grid ytics")
-    g("set style data histogram")
-    g("set style histogram errorbars gap 1")
-    g("set style fill pattern 0 border")
-    g("set auto x")
-    g("set xrange [-0.5:3.5]")
-    g("set xtics ('10' 0, '20' 1, '30' 2, '40' 3)")
-    
-    # get data for all clients
-    data = {}
+def plotMwBreakdownBarsByThread(data, clientCount):
+    # get data for all threads
+    bars = {}
     fields = ["Tqueue", "Tserver", "Tmw"]
     for f in fields:
-        data[f] = []
+        bars[f] = []
     
     for t in threads:
-        # create a list of logs from the runs
-        logs = [str(base / expdir.format(client=clientCount, thread=t, run=r) / "middleware.log") for r in range(0, runs)]
-        results = middleware.process(logs)
+        results = data("middleware", client=clientCount, thread=t)
         for f in fields:
-            data[f].append((t, results["get" + f + "MeanExp"][0], results["get" + f + "MeanExp"][1]))
+            bars[f].append((t, results["get" + f + "MeanExp"][0], results["get" + f + "MeanExp"][1]))
     
-    for f in fields:
-        g._add_to_queue([Gnuplot.Data(data[f], title=f, using="2:3")])
+    return render.figure("mw-time-threads.png", "Middleware Time Breakdown with " + str(clientCount) + " Total Clients", "Read Threads", "Time (s)",
+                         barCommands("top right", threads), [render.series(bars[f], title=f, using="2:3") for f in fields])
 
-    g.hardcopy(filename="mw-time-threads.png", terminal="png")
+def plotMwServers(data, threadCount, clientCount):
+    results = data("middleware", client=clientCount, thread=threadCount)
+    
+    # traces from before the server and key columns were logged have no per-server results
+    if not results.get("perServer"):
+        return None
+    
+    # one group of bars per memcached server, labelled with its share of the requests
+    servers = sorted(results["perServer"])
+    fields = ["Tqueue", "Tserver"]
+    bars = [render.series([(s, results["perServer"][s]["combined" + f + "Mean"][0], results["perServer"][s]["combined" + f + "Mean"][1]) for s in servers],
+                          title=f, using="2:3") for f in fields]
+    ticks = ["{:d} ({:.0%})".format(s, results["perServer"][s]["share"]) for s in servers]
+    
+    return render.figure("mw-servers.png", "Middleware Time per Server with " + str(threadCount) + " Read Threads and " + str(clientCount) + " Total Clients",
+                         "Server (Share of Requests)", "Time (s)", barCommands("top left", ticks), bars)
 
-def plotMwPercentile(threadCount, clientCount):
-    g = defaultPlot()
-    g.title("Middleware Percentiles with " + str(threadCount) + " Read Threads and " + str(clientCount) + " Total Clients")
-    g.xlabel("Percentile")
-    g.ylabel("Time (s)")
-    g("set key inside top left")
-    g("set logscale y")
-    g("unset yrange")
-    g("set format y \"10^{%L}\"")
-    g("set xtics 25")
-    
-    # read data from logs only once
-    logs = [str(base / expdir.format(client=clientCount, thread=threadCount, run=r) / "middleware.log") for r in range(0, runs)]
-    data = middleware.process(logs)
+def plotMwPercentile(data, threadCount, clientCount):
+    results = data("middleware", client=clientCount, thread=threadCount)
     
     fields = ["Tqueue", "Tserver", "Tmw"]
-    for (i, f) in enumerate(fields):
-        g._add_to_queue([Gnuplot.Data(data["get" + f + "Percentile"], title=f, with_="lp ls " + str(i + 1), using="1:2")])
-    
-    g.hardcopy(filename="mw-opt-percentile.png", terminal="png")
+    series = [render.series(results["get" + f + "Percentile"], title=f, with_="lp ls " + str(i + 1), using="1:2") for (i, f) in enumerate(fields)]
     
-def plotMwDistribution(threadCount, clientCount):
-    g = defaultPlot()
-    g.title("Middleware Time Distribution with " + str(clientCount) + " Total Clients")
-    g.xlabel("Time (s)")
-    g.ylabel("Occurrences")
-    g("set key inside top right")
-    g("unset xrange")
-    g("unset yrange")
-    g("set logscale x")
-    g("set logscale y")
+    return render.figure("mw-opt-percentile.png", "Middleware Percentiles with " + str(threadCount) + " Read Threads and " + str(clientCount) + " Total Clients",
+                         "Percentile", "Time (s)", render.defaultCommands() + ["set key inside top left", "set logscale y", "unset yrange",
+                         "set format y \"10^{%L}\"", "set xtics 25"], series)
     
-    logs = [str(base / expdir.format(client=clientCount, thread=threadCount, run=r) / "middleware.log") for r in range(0, runs)]
-    data = middleware.process(logs)
+def plotMwDistribution(data, threadCount, clientCount):
+    results = data("middleware", client=clientCount, thread=threadCount)
     
     # create one line for each field
     fields = ["Tqueue", "Tserver", "Tmw"]
-    for (i, f) in enumerate(fields):
-        g._add_to_queue([Gnuplot.Data(data["get" + f + "Distribution"], title=f, with_="lp lt " + str(i + 1))])
+    series = [render.series(results["get" + f + "Distribution"], title=f, with_="lp lt " + str(i + 1)) for (i, f) in enumerate(fields)]
     
-    g.hardcopy(filename="mw-opt-distribution.png", terminal="png")
+    return render.figure("mw-opt-distribution.png", "Middleware Time Distribution with " + str(clientCount) + " Total Clients", "Time (s)", "Occurrences",
+                         render.defaultCommands() + ["set key inside top right", "unset xrange", "unset yrange", "set logscale x", "set logscale y"], series)
 
-def plotResponseTimeHist(t):
-    g = Gnuplot.Gnuplot()
-    g.title("Response Time as a Function of Total Clients")
-    g.xlabel("Total Clients")
-    g.ylabel("Response Time (s)")
-    g("set grid ytics")
-    g("set style data candlesticks")
-    g("set style fill pattern 0 border")
-    g("set xtic 40")
-    g("set boxwidth 0.75")
-    g("set terminal png size 800,800")
-    g("set xtics ('120' 0, '160' 1, '200' 2, '240' 3, '280' 4, '320' 5, '360' 6)")
-    g("set xrange [-0.5:6.5]")
-    g("set yrange [0:0.03]")
-    
+def plotResponseTimeHist(data, t):
     # go over all clients
     rt = []
     for c in clients:
-        # create a list of lists with machines for each run
-        logs = [[str(l) for l in (base / expdir.format(client=c, thread=t, run=r)).glob("mema*.log")] for r in range(0, runs)]
-        results = [x[1] for x in memaslap.combineRuns(logs)["getRtStacked"]]
+        results = [x[1] for x in data("memaslapRuns", client=c, thread=t)["getRtStacked"]]
         # X Min 1stQuartile Median 3rdQuartile Max
         
         rt.append((c, min(results), percentile(results, 25), percentile(results, 50), percentile(results, 75), max(results)))
-    g._add_to_queue([Gnuplot.Data(rt, with_="candlesticks lt 1 whiskerbars 0.5", using="0:3:2:6:5")])
-    g._add_to_queue([Gnuplot.Data(rt, with_="candlesticks lt -1", using="0:4:4:4:4")])
     
-    g.hardcopy(filename="rt-percentile-no-threads.png", terminal="png")
+    series = [render.series(rt, with_="candlesticks lt 1 whiskerbars 0.5", using="0:3:2:6:5"),
+              render.series(rt, with_="candlesticks lt -1", using="0:4:4:4:4")]
+    return render.figure("rt-percentile-no-threads-" + str(t) + ".png", "Response Time as a Function of Total Clients", "Total Clients", "Response Time (s)",
+                         ["set grid ytics", "set style data candlesticks", "set style fill pattern 0 border", "set xtic 40", "set boxwidth 0.75",
+                          "set xtics (" + ", ".join(["'" + str(c) + "' " + str(i) for (i, c) in enumerate(clients)]) + ")",
+                          "set xrange [-0.5:" + str(len(clients) - 0.5) + "]", "set yrange [0:0.03]"], series, terminal="png size 800,800")
 
-#
+# the figures of the report are listed in part1-report.py, render them with report.py part1-report.py [group...]
 if __name__ == "__main__":
-    #plotResponseTimePercentile(320, 20, range(0, 101))
-    for t in threads:
-        plotResponseTimeHist(t)
-        
-    '''rtPercentile = (20, [0, 25, 50, 75, 95, 100]) # number of threads, percentiles
-    rtDistribution = 320 # number of clients
-    
-    mwBreakdownThreads = 20 # number of threads
-    mwBreakdownClients = 320 # number of clients
-    mwPercentile = (20, 320) # threads, clients
-    mwDistribution = (10, 360) # threads, clients
-
-    if len(sys.argv) > 1:
-        if sys.argv[1] == "tps":
-            plotThroughput()
-        elif sys.argv[1] == "rt":
-            plotResponseTimePercentile(rtPercentile[0], rtPercentile[1])
-            plotResponseTimeByClient()
-            plotResponseTimeDistribution(rtDistribution)
-        elif sys.argv[1] == "mw":
-            plotMwBreakdownBarsByClient(mwBreakdownThreads)
-            plotMwBreakdownBarsByThread(mwBreakdownClients)
-            plotMwPercentile(mwPercentile[0], mwPercentile[1])
-            plotMwDistribution(mwDistribution[0], mwDistribution[1])
-    else:
-        plotThroughput()
-        plotResponseTimePercentile(rtPercentile[0], rtPercentile[1])
-        plotResponseTimeByClient()
-        plotResponseTimeDistribution(rtDistribution)
-        
-        plotMwBreakdownBarsByClient(mwBreakdownThreads)
-        plotMwBreakdownBarsByThread(mwBreakdownClients)
-        plotMwPercentile(mwPercentile[0], mwPercentile[1])
-        plotMwDistribution(mwDistribution[0], mwDistribution[1])'''
-    
+    report.run(os.path.join(os.path.dirname(os.path.abspath(__file__)), "part1-report.py"), sys.argv[1:])
@@ -0,0 +1,64 @@
+# Headless, batched rendering of gnuplot figures
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+import parallel
+
+gnuplot = "gnuplot" # gnuplot executable
+
+# A figure is a dictionary holding everything needed to draw it, so it can be built from processed results
+# ahead of time and rendered anywhere: the output file and terminal, optional title and axis labels, gnuplot
+# commands to run before plotting (e.g. "set grid") and a list of series, see series()
+def figure(file, title=None, xlabel=None, ylabel=None, commands=None, series=None, terminal="png"):
+    return {"file": str(file), "terminal": terminal, "title": title, "xlabel": xlabel, "ylabel": ylabel,
+            "commands": list(commands) if commands is not None else [], "series": list(series) if series is not None else []}
+
+# One plotted series: rows of numbers, and optionally its key title, style (gnuplot's "with") and columns ("using")
+def series(data, title=None, with_=None, using=None):
+    return {"data": [tuple(row) for row in data], "title": title, "with": with_, "using": using}
+
+# The figure's defaults in the processing scripts: grid, both axes starting at 0
+def defaultCommands():
+    return ["set grid", "set yrange [0:]", "set xrange [0:]"]
+
+# Returns the gnuplot script drawing a figure, with the data of every series inline
+def getScript(figure):
+    lines = ["set terminal " + figure["terminal"], "set output " + quote(figure["file"])]
+    for k in ["title", "xlabel", "ylabel"]:
+        if figure[k] is not None:
+            lines.append("set " + k + " " + quote(figure[k]))
+    lines.extend(figure["commands"])
+
+    plots = []
+    for s in figure["series"]:
+        plot = "'-'"
+        if s["using"] is not None: plot = plot + " using " + s["using"]
+        plot = plot + (" title " + quote(s["title"]) if s["title"] is not None else " notitle")
+        if s["with"] is not None: plot = plot + " with " + s["with"]
+        plots.append(plot)
+    lines.append("plot " + ", ".join(plots))
+
+    for s in figure["series"]:
+        for row in s["data"]:
+            lines.append(" ".join([repr(float(v)) for v in row]))
+        lines.append("e")
+
+    lines.append("set output")
+    return "\n".join(lines) + "\n"
+
+# Quotes a string for gnuplot
+def quote(text):
+    return '"' + str(text).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+# Draws a figure with a gnuplot process of its own, returns the output file
+def render(figure):
+    result = subprocess.run([gnuplot], input=getScript(figure), universal_newlines=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        raise RuntimeError("gnuplot failed on " + figure["file"] + ": " + result.stderr.strip())
+    return figure["file"]
+
+# Draws every figure, up to workers at the same time (parallel.workers by default), returns the output files.
+# The work is done by the gnuplot processes, so threads are enough to keep them all busy.
+def renderAll(figures, workers=None):
+    if workers is None: workers = parallel.workers
+    with ThreadPoolExecutor(max(1, workers)) as pool:
+        return list(pool.map(render, figures))
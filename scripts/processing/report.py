@@ -0,0 +1,106 @@
+#!/usr/bin/python3
+
+# Declarative reports: a spec file lists the figures of a report, and for each the experiments (a grid of sweep
+# parameters) and the metrics (datasets) it draws from. All the (dataset, experiment) nodes the figures need,
+# with their dependencies, are gathered into one graph and each is computed exactly once, then every figure is
+# built from the memoized results and all of them are rendered in one batch. Datasets are read through a results
+# cache (see cache.Cache), so only logs that are new or have changed since the last report are processed:
+#
+# report.py <spec file> [group...]
+#
+# A spec file is Python, run with this directory on the path. It defines sweep (a sweep.Sweep), optionally
+# cacheFile (the cache database, sweep.base / "cache.db" by default) and figures, a list of dictionaries with:
+#     "figure": function building a render.figure, called as figure(data, **args) where data(dataset, **params)
+#               returns a dataset of the experiment matching params, or None if the results cannot show it
+#     "args": keyword arguments of the figure function (optional)
+#     "experiments": dictionary of parameter name -> list of values, every combination is used
+#     "metrics": datasets the figure reads for each of those experiments
+#     "group": name to select the figure by on the command line (optional)
+import sys
+import os
+import runpy
+import itertools
+from collections import OrderedDict
+import memaslap
+import middleware
+import cache
+import latency
+import render
+
+# Datasets that can be computed for an experiment: name -> (function, dependencies). The function is called with
+# the results cache, the experiment's name (its directory name without the run suffix) and the values of its
+# dependencies for the same experiment.
+datasets = OrderedDict()
+datasets["memaslapRuns"] = (lambda dataCache, name: memaslap.mergeRuns(dataCache.getRunResults("memaslap", dataCache.getRuns(name, "memaslap"))), [])
+datasets["memaslap"] = (lambda dataCache, name, memaslapRuns: memaslap.summarise(memaslapRuns), ["memaslapRuns"])
+datasets["middleware"] = (lambda dataCache, name: dataCache.getResults(name, "middleware"), [])
+datasets["latency"] = (lambda dataCache, name, memaslapRuns, middleware: latency.tail(memaslapRuns, middleware), ["memaslapRuns", "middleware"])
+
+# Dependency graph of (dataset, experiment name) nodes over a sweep, computing each node at most once.
+# dataCache is a cache.Cache over the sweep's results directory
+class Report(object):
+    def __init__(self, sweep, dataCache, datasets=datasets):
+        self.sweep = sweep
+        self.dataCache = dataCache
+        self.datasets = datasets
+        self.results = {}
+
+    # Returns a dataset of the experiment matching params, computing it (and its dependencies) if needed
+    def get(self, dataset, **params):
+        return self.compute((dataset, self.sweep.experiment(**params)["name"]))
+
+    # Returns the value of a node, computing its dependencies first
+    def compute(self, node):
+        if node not in self.results:
+            (dataset, name) = node
+            (function, dependencies) = self.datasets[dataset]
+            values = [self.compute((d, name)) for d in dependencies]
+            self.results[node] = function(self.dataCache, name, *values)
+        return self.results[node]
+
+    # Returns every node the figures need, dependencies before the nodes depending on them, each listed once
+    def plan(self, figures):
+        nodes = OrderedDict()
+        for f in figures:
+            for params in getGrid(f.get("experiments", {})):
+                name = self.sweep.experiment(**params)["name"]
+                for m in f.get("metrics", []):
+                    self.addNode(nodes, (m, name))
+        return list(nodes)
+
+    # Add a node to an ordered set of nodes after its dependencies
+    def addNode(self, nodes, node):
+        if node in nodes:
+            return
+        for d in self.datasets[node[0]][1]:
+            self.addNode(nodes, (d, node[1]))
+        nodes[node] = True
+
+    # Compute every node the figures need, then build the figures from the results, leaving out those that are None
+    def build(self, figures):
+        for node in self.plan(figures):
+            self.compute(node)
+        built = [f["figure"](self.get, **f.get("args", {})) for f in figures]
+        return [f for f in built if f is not None]
+
+# Every combination of the values in a dictionary of parameter name -> list of values, as dictionaries
+def getGrid(experiments):
+    names = list(experiments)
+    return [dict(zip(names, values)) for values in itertools.product(*[experiments[n] for n in names])]
+
+# Run a spec file, building and rendering its figures (only those in groups, if given)
+def run(specFile, groups=None):
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    spec = runpy.run_path(specFile)
+    figures = [f for f in spec["figures"] if not groups or f.get("group") in groups]
+    return render.renderAll(Report(spec["sweep"], getCache(spec["sweep"], spec.get("cacheFile"))).build(figures))
+
+# Returns a results cache over a sweep's results directory, covering as many runs as its experiments have
+def getCache(sweep, cacheFile=None):
+    if cacheFile is None: cacheFile = sweep.base / "cache.db"
+    runs = max([r.get("run", 0) for r in sweep.query()] + [0]) + 1
+    return cache.Cache(sweep.base, cacheFile, runs=runs)
+
+if __name__ == "__main__":
+    for f in run(sys.argv[1], sys.argv[2:]):
+        print(f)
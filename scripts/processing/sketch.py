@@ -0,0 +1,112 @@
+# Mergeable, fixed-size summaries of latency samples
+import numpy as np
+from math import log, ceil, sqrt
+
+# Default bucketing: relative accuracy and the range of values (in seconds) that can be told apart
+accuracy = 0.01
+minValue = 1e-9
+maxValue = 1e3
+
+# Log-bucketed histogram in the style of HDR histograms / DDSketch. Bucket i holds the values in
+# (minValue * gamma^(i-1), minValue * gamma^i] with gamma = (1 + accuracy) / (1 - accuracy), and
+# reports them as 2 * minValue * gamma^i / (gamma + 1), which is within accuracy (relative) of every
+# value in the bucket. Values outside [minValue, maxValue] are clamped to the range.
+#
+# Count, mean, standard deviation, minimum and maximum are exact. Percentiles are within accuracy
+# (relative) of the sample at the same rank, except 0 and 100 which are the exact minimum and maximum.
+# Distributions put each bucket in the bin holding its reported value, so only samples within accuracy
+# of a bin edge can end up in the neighbouring bin. Memory is constant and sketches with the same
+# bucketing merge exactly.
+class Sketch(object):
+    def __init__(self, accuracy=accuracy, minValue=minValue, maxValue=maxValue):
+        self.accuracy = accuracy
+        self.minValue = minValue
+        self.maxValue = maxValue
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self.counts = np.zeros(self.bucket(maxValue) + 1, dtype=np.int64)
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0 # sum of squared differences from the mean
+        self.minimum = np.inf
+        self.maximum = -np.inf
+
+    # Index of the bucket holding value
+    def bucket(self, value):
+        return int(ceil(log(value / self.minValue) / log(self.gamma)))
+
+    # Add an array of samples
+    def add(self, values):
+        values = np.asarray(values, dtype=float).ravel()
+        if len(values) == 0:
+            return
+
+        clamped = np.clip(values, self.minValue, self.maxValue)
+        indices = np.ceil(np.log(clamped / self.minValue) / log(self.gamma)).astype(np.int64)
+        self.counts += np.bincount(indices, minlength=len(self.counts))
+
+        # exact moments, merged chunk by chunk
+        self.combine(len(values), values.mean(), np.square(values - values.mean()).sum())
+        self.minimum = min(self.minimum, values.min())
+        self.maximum = max(self.maximum, values.max())
+
+    # Merge the samples of another sketch with the same bucketing into this one
+    def merge(self, other):
+        if (other.accuracy, other.minValue, other.maxValue) != (self.accuracy, self.minValue, self.maxValue):
+            raise ValueError("Cannot merge sketches with different bucketing")
+        self.counts += other.counts
+        self.combine(other.count, other.mean, other.m2)
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+
+    # Combine the moments of another group of samples with these (Chan et al.)
+    def combine(self, count, mean, m2):
+        if count == 0:
+            return
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean = self.mean + delta * count / total
+        self.m2 = self.m2 + m2 + delta * delta * self.count * count / total
+        self.count = total
+
+    # Population standard deviation, as numpy.std
+    def std(self):
+        if self.count == 0:
+            return np.nan
+        return sqrt(self.m2 / self.count)
+
+    # Reported value of every bucket, clamped to the exact extremes
+    def values(self):
+        values = 2 * self.minValue * self.gamma ** np.arange(len(self.counts)) / (self.gamma + 1)
+        return np.clip(values, self.minimum, self.maximum)
+
+    # Estimate of the pth percentile (0-100), using the same ranks as numpy.percentile
+    def percentile(self, p):
+        if self.count == 0:
+            return np.nan
+        if p <= 0:
+            return self.minimum
+        if p >= 100:
+            return self.maximum
+        rank = int(round(p / 100 * (self.count - 1)))
+        return self.values()[np.searchsorted(np.cumsum(self.counts), rank, side="right")]
+
+    # Estimate of the fraction of samples above value, only samples within accuracy of value can be misplaced
+    def above(self, value):
+        if self.count == 0:
+            return np.nan
+        return self.counts[self.values() > value].sum() / self.count
+
+    # Estimate of numpy.histogram(samples, bins), returns (counts, edges)
+    def histogram(self, bins):
+        if self.count == 0:
+            return np.histogram([], bins=bins)
+        used = self.counts > 0
+        (counts, edges) = np.histogram(self.values()[used], bins=bins, range=(self.minimum, self.maximum), weights=self.counts[used])
+        return (counts.astype(np.int64), edges)
+
+# Merge a list of sketches into a new one
+def mergeAll(sketches):
+    merged = Sketch(sketches[0].accuracy, sketches[0].minValue, sketches[0].maxValue)
+    for s in sketches:
+        merged.merge(s)
+    return merged
@@ -0,0 +1,161 @@
+# Confidence intervals and outliers for experiment results
+import numpy as np
+from math import lgamma, log, exp, sqrt, erf
+from functools import lru_cache
+
+confidence = 0.95 # two-sided confidence level used when none is given
+batches = 20 # batches used by batchMeansCI
+resamples = 2000 # bootstrap resamples used by bootstrapCI
+resampleElements = 2000000 # resampled indices held in memory at once by bootstrapCI
+maxRuns = 1000 # largest run count runsForWidth will suggest
+outlierLevel = 0.99 # confidence level of outliers(), for all the values together
+
+# Returns the (mean, half width) of the confidence interval of the mean of independent samples, e.g. one value
+# per run, using the t-quantile for len(samples) - 1 degrees of freedom unless tValue is given
+def meanCI(samples, level=None, tValue=None):
+    samples = np.asarray(samples, dtype=float).ravel()
+    if len(samples) < 2:
+        return (samples.mean() if len(samples) > 0 else np.nan, np.nan)
+    if tValue is None:
+        tValue = tQuantile(level, len(samples) - 1)
+    return (samples.mean(), tValue * samples.std(ddof=1) / sqrt(len(samples)))
+
+# Returns the (mean, half width) of the confidence interval of the mean of a correlated series, e.g. the
+# per-request samples of one run in arrival order, from the means of contiguous batches
+def batchMeansCI(samples, count=batches, level=None):
+    samples = np.asarray(samples, dtype=float).ravel()
+    size = len(samples) // count
+    if size == 0:
+        return meanCI(samples, level)
+    return meanCI(samples[:size * count].reshape(count, size).mean(axis=1), level)
+
+# Returns (estimate, lower, upper) of the percentile bootstrap confidence interval of statistic, a function
+# taking an array and an axis such as numpy.mean or lambda x, axis: numpy.percentile(x, 99, axis=axis).
+# Resamples are drawn in chunks of at most resampleElements indices, reusing the same index arrays.
+def bootstrapCI(samples, statistic=np.mean, count=resamples, level=None, seed=None):
+    if level is None: level = confidence
+    samples = np.asarray(samples, dtype=float).ravel()
+    if len(samples) == 0:
+        return (np.nan, np.nan, np.nan)
+
+    rng = np.random.default_rng(seed)
+    rows = max(1, min(count, resampleElements // len(samples)))
+    uniform = np.empty((rows, len(samples)))
+    indices = np.empty((rows, len(samples)), dtype=np.intp)
+    estimates = np.empty(count)
+
+    for start in range(0, count, rows):
+        n = min(rows, count - start)
+        rng.random(out=uniform)
+        uniform *= len(samples)
+        np.copyto(indices, uniform, casting="unsafe")
+        estimates[start:start + n] = statistic(samples[indices[:n]], axis=1)
+
+    (lower, upper) = np.percentile(estimates, [50 * (1 - level), 50 * (1 + level)])
+    return (statistic(samples, axis=0), lower, upper)
+
+# Returns the number of runs needed for the confidence interval of the mean of samples (one value per run)
+# to be at most width either side, assuming further runs vary as much as these. With relative set, width is
+# a fraction of the mean. Returns maxRuns if even that many would not do.
+def runsForWidth(samples, width, level=None, relative=False):
+    samples = np.asarray(samples, dtype=float).ravel()
+    if len(samples) < 2:
+        return max(2, len(samples) + 1)
+    if relative:
+        width = width * abs(samples.mean())
+
+    deviation = samples.std(ddof=1)
+    for n in range(2, maxRuns):
+        if tQuantile(level, n - 1) * deviation / sqrt(n) <= width:
+            return max(n, len(samples))
+    return maxRuns
+
+# Returns the indices of the values that do not belong with the others, e.g. the machines or servers much slower
+# or faster than the rest. Each value is tested against the prediction interval of the other n - 1 values, as
+# (x - mean) / (s * sqrt(1 + 1 / (n - 1))) follows Student's t with n - 2 degrees of freedom, widened by the value's
+# own standard error if errors are given (a known variance, so scaled by the normal quantile rather than t's). The
+# level is split between the n tests (Bonferroni), so values from one distribution are flagged with probability at
+# most 1 - level. Needs at least three values.
+def outliers(values, errors=None, level=None):
+    if level is None: level = outlierLevel
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    if n < 3:
+        return []
+    errors = np.zeros(n) if errors is None else np.asarray(errors, dtype=float)
+
+    t = tQuantile(1 - (1 - level) / n, n - 2)
+    z = zQuantile(1 - (1 - level) / n)
+    found = []
+    for i in range(n):
+        others = np.delete(values, i)
+        width = np.sqrt(t * t * others.var(ddof=1) * (1 + 1 / (n - 1)) + z * z * errors[i] ** 2)
+        if abs(values[i] - others.mean()) > width:
+            found.append(i)
+    return found
+
+# Returns the two-sided t-quantile for a confidence level and degrees of freedom, e.g. 2.776 for 0.95 and 4
+@lru_cache(maxsize=None)
+def tQuantile(level, df):
+    if level is None: level = confidence
+    p = 1 - (1 - level) / 2
+
+    # bisect the CDF, doubling the upper bound until it is above the quantile
+    (low, high) = (0.0, 1.0)
+    while tCDF(high, df) < p:
+        (low, high) = (high, high * 2)
+    for i in range(200):
+        middle = (low + high) / 2
+        if tCDF(middle, df) < p:
+            low = middle
+        else:
+            high = middle
+        if high - low < 1e-12 * high:
+            break
+    return (low + high) / 2
+
+# Returns the two-sided quantile of the standard normal distribution for a confidence level, e.g. 1.96 for 0.95
+@lru_cache(maxsize=None)
+def zQuantile(level):
+    if level is None: level = confidence
+    (low, high) = (0.0, 40.0)
+    for i in range(200):
+        middle = (low + high) / 2
+        if erf(middle / sqrt(2)) < level:
+            low = middle
+        else:
+            high = middle
+    return (low + high) / 2
+
+# Student's t cumulative distribution function for t >= 0
+def tCDF(t, df):
+    return 1 - 0.5 * betaIncomplete(df / 2, 0.5, df / (df + t * t))
+
+# Regularized incomplete beta function I_x(a, b), by its continued fraction (Numerical Recipes 6.4)
+def betaIncomplete(a, b, x):
+    if x <= 0:
+        return 0.0
+    if x >= 1:
+        return 1.0
+    front = exp(lgamma(a + b) - lgamma(a) - lgamma(b) + a * log(x) + b * log(1 - x))
+    if x < (a + 1) / (a + b + 2):
+        return front * betaFraction(a, b, x) / a
+    return 1 - front * betaFraction(b, a, 1 - x) / b
+
+# Continued fraction of the incomplete beta function, evaluated with the modified Lentz method
+def betaFraction(a, b, x, iterations=300, epsilon=1e-15, tiny=1e-300):
+    c = 1.0
+    d = 1 - (a + b) * x / (a + 1)
+    d = 1 / (d if abs(d) > tiny else tiny)
+    h = d
+    for m in range(1, iterations):
+        for numerator in [m * (b - m) * x / ((a + 2 * m - 1) * (a + 2 * m)),
+                          -(a + m) * (a + b + m) * x / ((a + 2 * m) * (a + 2 * m + 1))]:
+            d = 1 + numerator * d
+            d = 1 / (d if abs(d) > tiny else tiny)
+            c = 1 + numerator / c
+            c = c if abs(c) > tiny else tiny
+            h = h * d * c
+        if abs(d * c - 1) < epsilon:
+            break
+    return h
@@ -0,0 +1,29 @@
+# Steady-state detection for throughput time series
+import numpy as np
+
+# Returns the number of leading observations to discard as warm-up, using MSER-b (MSER-5 by default):
+# the series is cut into batches of batch observations and the truncation point d minimising
+# SSE(batches[d:]) / len(batches[d:])^2 is chosen, with d limited to the first half of the batches
+def mser(series, batch=5):
+    x = np.asarray(series, dtype=float)
+    batches = len(x) // batch
+    if batches < 4:
+        return 0
+
+    means = x[:batches * batch].reshape(batches, batch).mean(axis=1)
+
+    # sums over means[d:] for every d, accumulated from the end
+    remaining = np.arange(batches, 0, -1)
+    sums = np.cumsum(means[::-1])[::-1]
+    squares = np.cumsum(np.square(means[::-1]))[::-1]
+    statistic = (squares - np.square(sums) / remaining) / np.square(remaining)
+
+    return int(np.argmin(statistic[:batches // 2 + 1])) * batch
+
+# Returns the (start, end) indices of the steady part of a series: warm-up is found with MSER on the series,
+# cool-down with MSER on what is left, reversed
+def getWindow(series, batch=5):
+    x = np.asarray(series, dtype=float)
+    start = mser(x, batch)
+    end = len(x) - mser(x[start:][::-1], batch)
+    return (start, end)
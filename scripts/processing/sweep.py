@@ -0,0 +1,118 @@
+# Index of the runs in an experiment sweep, built from the directory names of a results tree
+import re
+from pathlib import Path
+from collections import OrderedDict
+import memaslap
+
+# Finds every run directory in base matching a directory template such as "sec1-c{client}-v{thread}-r{run}",
+# parses the parameter values out of the names and records the logs of each run. The tree is scanned once,
+# on the first query.
+#
+# values optionally maps directory tokens back to parameter values, e.g. {"work": {"2": "2.5", "7": "7.5"}}.
+# Parameters with a map keep string values (unmapped tokens are kept as they are), all others are
+# converted to integers where possible.
+class Sweep(object):
+    def __init__(self, base, template, values=None):
+        self.base = Path(base)
+        self.template = template
+        self.values = values if values is not None else {}
+        self.pattern = getPattern(template)
+        self.params = re.findall(r"{(\w+)}", template)
+        self.runs = None
+
+    # Scan the results tree, replacing whatever was indexed before
+    def scan(self):
+        self.runs = []
+        for d in sorted(self.base.iterdir()):
+            match = self.pattern.match(d.name)
+            if match is None or not d.is_dir():
+                continue
+
+            run = {}
+            for p in self.params:
+                run[p] = self.getValue(p, match.group(p))
+            run["name"] = self.getName(match)
+            run["path"] = d
+            run["memaslap"] = memaslap.findLogs(d)
+            run["middleware"] = str(d / "middleware.log") if (d / "middleware.log").exists() else None
+            self.runs.append(run)
+
+        self.runs.sort(key=lambda r: (r["name"], r.get("run", 0)))
+
+    # Returns every indexed run whose parameters match the given ones
+    def query(self, **params):
+        if self.runs is None:
+            self.scan()
+        return [r for r in self.runs if all([r.get(p) == v for (p, v) in params.items()])]
+
+    # Returns every experiment (the runs sharing all parameters but run) matching the given parameters,
+    # as dictionaries of its parameters, its name (directory name without the run suffix) and its runs
+    def experiments(self, **params):
+        experiments = OrderedDict()
+        for r in self.query(**params):
+            if r["name"] not in experiments:
+                experiments[r["name"]] = dict([(p, r[p]) for p in self.params if p != "run"])
+                experiments[r["name"]]["name"] = r["name"]
+                experiments[r["name"]]["runs"] = []
+            experiments[r["name"]]["runs"].append(r)
+        return list(experiments.values())
+
+    # Returns the only experiment matching the given parameters
+    def experiment(self, **params):
+        matches = self.experiments(**params)
+        if len(matches) != 1:
+            raise KeyError("{:d} experiments match {:s}".format(len(matches), str(params)))
+        return matches[0]
+
+    # Returns the experiments matching the given parameters, grouped by the values of one parameter
+    def groupBy(self, param, **params):
+        groups = OrderedDict()
+        for e in sorted(self.experiments(**params), key=lambda e: sortKey(e[param])):
+            groups.setdefault(e[param], []).append(e)
+        return groups
+
+    # Returns the distinct values of a parameter among the runs matching the given parameters
+    def getValues(self, param, **params):
+        return sorted(set([r[param] for r in self.query(**params)]), key=sortKey)
+
+    # Returns the memaslap logs of the experiment matching the given parameters, one list per run
+    def memaslapLogs(self, **params):
+        return [r["memaslap"] for r in self.experiment(**params)["runs"]]
+
+    # Returns the middleware logs of the experiment matching the given parameters, skipping runs without one
+    def middlewareLogs(self, **params):
+        return [r["middleware"] for r in self.experiment(**params)["runs"] if r["middleware"] is not None]
+
+    # Converts a directory token into a parameter value
+    def getValue(self, param, token):
+        if param in self.values:
+            return self.values[param].get(token, token)
+        try:
+            return int(token)
+        except ValueError:
+            return token
+
+    # Directory name of the experiment a matched run belongs to, i.e. without "-r{run}"
+    def getName(self, match):
+        tokens = match.groupdict()
+        return re.sub(r"-?r?\{run\}$", "", self.template).format(**tokens)
+
+# Compiles a directory template into a regular expression with one named group per parameter
+def getPattern(template):
+    pattern = ""
+    for (i, part) in enumerate(re.split(r"{(\w+)}", template)):
+        if i % 2 == 0:
+            pattern = pattern + re.escape(part)
+        else:
+            pattern = pattern + "(?P<" + part + ">[^/]+?)"
+    return re.compile(pattern + "$")
+
+# Sorts numbers numerically and anything else by its numeric prefix, then alphabetically
+def sortKey(value):
+    if isinstance(value, (int, float)):
+        return (value, "")
+    match = re.match(r"[\d.]+", str(value))
+    try:
+        return (float(match.group()) if match else float("inf"), str(value))
+    except ValueError:
+        return (float("inf"), str(value))